@@ -5,7 +5,45 @@
 """
 This Python script facilitates the copying of files and directories while providing a progress bar for better user experience. 
 It checks if the destination directory already exists and exits with an error message if it does. 
-The script recursively copies the contents of the source directory to the destination, updating the progress bar for each file copied. 
+The source tree is walked once up front, and the files found are copied concurrently by a pool of worker threads 
+(configurable with '--jobs N'), all of them feeding a single aggregate progress bar. 
+Copying trees with many small files is bound by per-file syscall latency rather than disk bandwidth, so several files 
+in flight at once keep the disks busy. Use '--jobs 1' for the classic one-file-at-a-time copy. 
+The '--benchmark' option builds synthetic trees (many small files and a few huge files) in a temporary directory 
+and compares serial and parallel runs on them. 
+With '--resume' an append-only journal ('<destination>.copy-journal') records every finished file and the last committed 
+offset of large in-flight files. Journal writes are batched and synced together rather than once per file. 
+Rerunning an interrupted copy with '--resume' skips the finished files and continues large files from their last 
+committed chunk; the journal is removed once the copy completes. 
+With '--sync' the destination may already exist: only files whose size or modification time differ are transferred 
+(like rsync), and the skipped and copied bytes are reported at the end. '--checksum sampled|full' compares file 
+contents with a fast hash (xxhash when installed, BLAKE2 otherwise) instead of trusting modification times. The 
+comparison runs in worker threads while the directory scan is still in progress, so unchanged trees finish quickly. 
+'--delta' (implies '--sync') updates large changed files in place: source and destination are read block by block 
+with pread, and only the blocks that differ are rewritten with pwrite, so a few changed megabytes inside a 40 GB 
+VM image cost a read of both files but only a few megabytes of writes. The progress bar counts scanned bytes and 
+shows the bytes actually written next to it. 
+'--archive' preserves ownership, permissions, extended attributes (POSIX ACLs included), hardlinks, symlinks, special 
+files and directory timestamps, like 'cp -a'. Hardlinks are detected through an (st_dev, st_ino) index so every inode is 
+copied once, all attributes come from the stat results of the initial scan (no per-file stat storm), and directory 
+timestamps are applied in a final bottom-up pass. The benchmark compares it against 'cp -a' on a tree with hardlinks, 
+symlinks and xattrs. 
+'--progress=json' replaces the bar with JSON lines for automation (bytes and files done, current throughput, ETA and 
+per-file latency percentiles), emitted at most twice a second by a background thread so that reporting never slows 
+the copy; '--progress-output PATH' sends them to a file or FIFO instead of stdout. The last line is a summary with 
+p50/p90/p99 per-file copy times and the slowest directories. 
+'--manifest PATH' hashes each file while its bytes are in flight and writes a checksum manifest ('--hash' blake2b, sha256 
+or xxh3 when xxhash is installed), so no second 'sha256sum' pass over both trees is needed. Each chunk is hashed in a 
+thread pool from the same buffer it is written from, overlapping the I/O. '--verify' re-reads the destination with 
+parallel workers and reports any file whose checksum differs (exit status 1). 
+'--pipeline' targets many tiny files on network filesystems (NFS/SSHFS), where per-file round trips dominate: a 
+producer thread packs files up to 256 KiB into an in-memory PAX tar stream (mode, times and xattrs in the headers, 
+like GNU tar) and a consumer unpacks it at the destination, setting metadata through the open descriptor instead of 
+repeated path lookups. Larger files still take the direct path. The benchmark measures files/s of both paths against 
+a slow-filesystem simulator that adds a fixed latency to every destination metadata call. 
+'--schedule device' groups the pending files by the st_dev of their source and destination and runs a bounded number 
+of workers per device: one worker with inode-ordered files for rotating disks (sequential head movement), a deep 
+queue of '--jobs' workers for SSDs. Throughput is reported per device at the end. 
 It utilizes the 'tqdm' library to display the progress of the file copying process. 
 The script requires two command-line arguments: the source and destination directories.
 
@@ -13,50 +51,1286 @@ Dependencies:
 1. 'os' - Native library for interacting with the operating system (no installation needed).
 2. 'sys' - Native library for system-specific parameters and functions (no installation needed).
 3. 'shutil' - Native library for file operations (no installation needed).
-4. 'tqdm' - Third-party library for displaying progress bars (install via pip).
+4. 'argparse' - Native library for parsing command-line arguments (no installation needed).
+5. 'concurrent.futures' - Native library for the worker thread pool (no installation needed).
+6. 'json' / 'threading' - Native libraries for the resume journal (no installation needed).
+7. 'hashlib' - Native library, BLAKE2 hashes for '--checksum' (no installation needed).
+8. 'tqdm' - Third-party library for displaying progress bars (install via pip).
+9. 'stat' / 'errno' / 'subprocess' - Native libraries for '--archive' and its 'cp -a' benchmark (no installation needed).
+   'tarfile' / 'queue' / 'io' - Native libraries for the '--pipeline' tar stream (no installation needed).
+10. 'xxhash' - Optional third-party library, faster '--checksum' hashing (install via pip).
 
 Installation of Dependencies:
 - Install the 'tqdm' library using pip:
   
   pip install tqdm
+
+- Optionally install 'xxhash' for faster checksums:
+
+  pip install xxhash
 """
 
 import os
 import sys
+import json
+import stat
+import errno
+import io
+import queue
+import hashlib
+import tarfile
+import time
+import shutil
+import threading
+import tempfile
+import argparse
+import subprocess
 from shutil import copy2
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-def copy_with_progress(source, destination):
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+DEFAULT_JOBS = os.cpu_count() or 1
+BATCH_FILES = 64
+BATCH_BYTES = 16 * 1024 * 1024
+JOURNAL_SUFFIX = '.copy-journal'
+JOURNAL_BATCH = 1000
+JOURNAL_INTERVAL = 2.0
+RESUMABLE_MIN_SIZE = 64 * 1024 * 1024
+RESUMABLE_CHUNK = 8 * 1024 * 1024
+RESUMABLE_COMMIT = 64 * 1024 * 1024
+CHECKSUM_MODES = ['sampled', 'full']
+CHECKSUM_SAMPLE = 64 * 1024
+DELTA_BLOCK = 1024 * 1024
+DELTA_MIN_SIZE = 16 * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+PROGRESS_MODES = ['bar', 'json']
+PROGRESS_INTERVAL = 0.5
+PROGRESS_WINDOW = 10000
+SLOW_DIRECTORIES = 10
+SCHEDULES = ['pool', 'device']
+PIPELINE_MAX_SIZE = 256 * 1024
+PIPELINE_CHUNK = 1024 * 1024
+PIPELINE_QUEUE = 8
+XATTR_PAX_PREFIX = 'SCHILY.xattr.'
+
+# Extended attributes the destination filesystem refuses are skipped, like shutil does.
+XATTR_ERRNOS = {errno.EPERM, errno.ENOTSUP, errno.ENODATA, errno.EINVAL}
+
+HASH_ALGORITHMS = {'blake2b': hashlib.blake2b, 'sha256': hashlib.sha256}
+if xxhash is not None:
+    HASH_ALGORITHMS['xxh3'] = xxhash.xxh3_128
+
+CopyOptions = namedtuple('CopyOptions', ['jobs', 'resume', 'sync', 'checksum', 'delta', 'archive',
+                                         'progress', 'progress_output', 'manifest', 'hash', 'verify', 'schedule',
+                                         'pipeline'],
+                         defaults=[DEFAULT_JOBS, False, False, None, False, False, 'bar', None, None, 'blake2b', False,
+                                   'pool', False])
+
+class ChecksumManifest:
+    """Digests of the copied files, computed while their bytes are in flight.
+
+    The manifest is written in the coreutils '*sum' format, so 'b2sum -c' (blake2b) or 'sha256sum -c' can check it.
+    """
+
+    def __init__(self, destination, algorithm='blake2b', jobs=DEFAULT_JOBS):
+        self.destination = destination
+        self.algorithm = algorithm
+        self.digests = {}
+        self.pool = ThreadPoolExecutor(max_workers=jobs)
+        self._lock = threading.Lock()
+
+    def new_digest(self):
+        return HASH_ALGORITHMS[self.algorithm]()
+
+    def record(self, dst, digest):
+        with self._lock:
+            self.digests[os.path.relpath(dst, self.destination)] = digest.hexdigest()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for relative_path in sorted(self.digests):
+                f.write(f"{self.digests[relative_path]}  {relative_path}\n")
+
+    def verify(self, jobs=DEFAULT_JOBS):
+        """Re-read every destination file in parallel; return the relative paths whose digest differs."""
+        def check(relative_path):
+            path = os.path.join(self.destination, relative_path)
+            drop_cached_pages(path)
+            return relative_path, file_hexdigest(path, self.new_digest()) == self.digests[relative_path]
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return sorted(path for path, ok in executor.map(check, self.digests) if not ok)
+
+    def close(self):
+        self.pool.shutdown()
+
+def drop_cached_pages(path):
+    """Best effort: ask the kernel to drop clean cached pages so verification reads what is on disk."""
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def file_hexdigest(path, digest):
+    buffer = bytearray(HASH_CHUNK)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            length = f.readinto(buffer)
+            if not length:
+                break
+            digest.update(view[:length])
+    return digest.hexdigest()
+
+class JsonProgress:
+    """Stand-in for the tqdm bar that reports progress as JSON lines for automation.
+
+    The copy loop only bumps counters; a background thread samples them every PROGRESS_INTERVAL seconds and does
+    the encoding and writing, so a slow reader (a FIFO, for example) never stalls the copy. A final summary line
+    carries the per-file latency percentiles and the slowest directories.
+    """
+
+    def __init__(self, total, files_total, destination, output=None, interval=PROGRESS_INTERVAL):
+        self.total = total
+        self.n = 0
+        self.files_total = files_total
+        self.files_done = 0
+        self.postfix = None
+        self.extra = {}
+        self.destination = destination
+        self.interval = interval
+        self._output = output
+        self._stream = None
+        self._timings = []
+        self._window = deque(maxlen=PROGRESS_WINDOW)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = time.monotonic()
+
+    def __enter__(self):
+        # Opening a FIFO blocks until a reader shows up, so do it before any work starts.
+        self._stream = open(self._output, 'w', buffering=1) if self._output else sys.stdout
+        self._started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, n=1):
+        self.n += n
+
+    def set_postfix_str(self, postfix):
+        self.postfix = postfix
+
+    def record_files(self, timings):
+        with self._lock:
+            self.files_done += len(timings)
+            self._timings.extend(timings)
+            self._window.extend(seconds for _, seconds in timings)
+
+    def _run(self):
+        last_bytes = 0
+        last_time = self._started
+        throughput = None
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            instant = (self.n - last_bytes) / max(now - last_time, 1e-9)
+            throughput = instant if throughput is None else 0.7 * throughput + 0.3 * instant
+            last_bytes, last_time = self.n, now
+            with self._lock:
+                window = sorted(self._window)
+            self._emit({
+                'event': 'progress',
+                'elapsed': round(now - self._started, 3),
+                'bytes_done': self.n,
+                'bytes_total': self.total,
+                'files_done': self.files_done,
+                'files_total': self.files_total,
+                'throughput': round(throughput),
+                'eta': round((self.total - self.n) / throughput, 1) if throughput else None,
+                'latency_p50': percentile(window, 50),
+                'latency_p99': percentile(window, 99),
+                'postfix': self.postfix,
+            })
+
+    def summary(self):
+        elapsed = time.monotonic() - self._started
+        latencies = sorted(seconds for _, seconds in self._timings)
+        directories = {}
+        for dst, seconds in self._timings:
+            directory = os.path.relpath(os.path.dirname(dst), self.destination)
+            directories.setdefault(directory, []).append(seconds)
+        slowest = sorted(directories.items(), key=lambda item: sum(item[1]), reverse=True)[:SLOW_DIRECTORIES]
+        return dict({
+            'event': 'summary',
+            'elapsed': round(elapsed, 3),
+            'bytes_done': self.n,
+            'files_done': self.files_done,
+            'throughput': round(self.n / max(elapsed, 1e-9)),
+            'latency_p50': percentile(latencies, 50),
+            'latency_p90': percentile(latencies, 90),
+            'latency_p99': percentile(latencies, 99),
+            'latency_max': round(latencies[-1], 6) if latencies else None,
+            'slowest_directories': [
+                {'path': path, 'files': len(times), 'seconds': round(sum(times), 6),
+                 'latency_p99': percentile(sorted(times), 99)}
+                for path, times in slowest
+            ],
+        }, **self.extra)
+
+    def _emit(self, record):
+        self._stream.write(json.dumps(record) + '\n')
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self._emit(self.summary())
+        if self._stream is not sys.stdout:
+            self._stream.close()
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list, in seconds rounded to microseconds."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, -(-len(sorted_values) * pct // 100) - 1))
+    return round(sorted_values[int(index)], 6)
+
+class CopyJournal:
+    """Append-only record of finished files and of the committed offset of large in-flight files.
+
+    Records are buffered and written in batches; before a batch is written the files it marks as finished (and their
+    directories) are fsynced, so the journal never claims more than what reached the disk. Partial offsets are only
+    recorded after copy_resumable has fsynced the data up to them.
+    """
+
+    def __init__(self, destination):
+        self.destination = destination
+        self.path = journal_path(destination)
+        self.done = set()
+        self.partial = {}
+        if os.path.exists(self.path):
+            self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._pending = []
+        self._unsynced = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn last line of an interrupted write
+                if 'offset' in record:
+                    self.partial[record['path']] = record['offset']
+                else:
+                    self.done.add(record['path'])
+                    self.partial.pop(record['path'], None)
+
+    def key(self, dst):
+        return os.path.relpath(dst, self.destination)
+
+    def pending_files(self, files, pbar):
+        """Drop finished files from the plan and count finished bytes as already done."""
+        remaining = []
+        for item in files:
+            key = self.key(item[1])
+            if key in self.done:
+                pbar.update(item[2])
+            else:
+                pbar.update(self.partial.get(key, 0))
+                remaining.append(item)
+        return remaining
+
+    def record_done(self, dst):
+        self._append({'path': self.key(dst)}, dst)
+
+    def record_partial(self, dst, offset):
+        self._append({'path': self.key(dst), 'offset': offset})
+
+    def _append(self, record, unsynced=None):
+        with self._lock:
+            self._pending.append(json.dumps(record))
+            if unsynced is not None:
+                self._unsynced.append(unsynced)
+            if len(self._pending) >= JOURNAL_BATCH or time.monotonic() - self._last_flush >= JOURNAL_INTERVAL:
+                self._flush()
+
+    def _flush(self):
+        if self._pending:
+            # Only what this batch claims: a system-wide os.sync() would flush every filesystem on the host.
+            sync_paths(self._unsynced)
+            self._unsynced = []
+            self._file.write('\n'.join(self._pending) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+        self._file.close()
+
+    def remove(self):
+        os.remove(self.path)
+
+def sync_paths(paths):
+    """fsync each file, then each directory holding them, so both the data and the new directory entries are durable."""
+    directories = set()
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        directories.add(os.path.dirname(path))
+    for directory in directories:
+        fd = os.open(directory or '.', os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def journal_path(destination):
+    return os.path.normpath(destination) + JOURNAL_SUFFIX
+
+def copy_with_progress(source, destination, options=CopyOptions()):
+    if options.resume and os.path.exists(destination) and not os.path.exists(journal_path(destination)):
+        print(f"The destination directory '{destination}' exists but has no copy journal to resume from.")
+        sys.exit(1)
     try:
-        copytree_with_progress(source, destination)
+        mismatches = copytree_with_progress(source, destination, options)
     except FileExistsError:
         print(f"The destination directory '{destination}' It already exists.")
         sys.exit(1)
+    if mismatches:
+        sys.exit(1)
+
+def walk_tree(source, destination, archive=False):
+    """Yield (src_dir, dst_dir, dir_stat, [(src, dst, size, stat_result), ...]) for every directory of the source tree.
+
+    In archive mode symlinks are not followed and dir_stat holds the directory's own stat; otherwise it is None.
+    """
+    follow = not archive
+    pending = [(source, destination, os.stat(source) if archive else None)]
+    while pending:
+        src_dir, dst_dir, dir_st = pending.pop()
+        files = []
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                dest_path = os.path.join(dst_dir, entry.name)
+                if entry.is_dir(follow_symlinks=follow):
+                    pending.append((entry.path, dest_path, entry.stat(follow_symlinks=False) if archive else None))
+                else:
+                    st = entry.stat(follow_symlinks=follow)
+                    files.append((entry.path, dest_path, st.st_size, st))
+        yield src_dir, dst_dir, dir_st, files
+
+def scan_tree(source, destination, archive=False):
+    """Walk the source tree once and return the directories and the (src, dst, size, stat) files to copy."""
+    directories = []
+    files = []
+    for src_dir, dst_dir, dir_st, dir_files in walk_tree(source, destination, archive):
+        directories.append((src_dir, dst_dir, dir_st))
+        files.extend(dir_files)
+    return directories, files
 
-def copytree_with_progress(source, destination):
-    if not os.path.exists(destination):
-        os.makedirs(destination)
-    
-    for item in os.listdir(source):
-        src_path = os.path.join(source, item)
-        dest_path = os.path.join(destination, item)
-        
-        if os.path.isdir(src_path):
-            copytree_with_progress(src_path, dest_path)
+def plan_sync(source, destination, options=CopyOptions()):
+    """Scan the source while worker threads compare each scanned directory against the destination.
+
+    Returns the directories to create, the changed files to copy and the (count, bytes) of unchanged files.
+    """
+    directories = []
+    changed = []
+    skipped_files = 0
+    skipped_bytes = 0
+    with ThreadPoolExecutor(max_workers=options.jobs) as executor:
+        futures = []
+        for src_dir, dst_dir, dir_st, dir_files in walk_tree(source, destination, options.archive):
+            directories.append((src_dir, dst_dir, dir_st))
+            futures.append(executor.submit(compare_files, dir_files, options.checksum, options.archive))
+        for future in futures:
+            dir_changed, dir_skipped = future.result()
+            changed.extend(dir_changed)
+            skipped_files += len(dir_skipped)
+            skipped_bytes += sum(dir_skipped)
+    return directories, changed, (skipped_files, skipped_bytes)
+
+def compare_files(dir_files, checksum=None, archive=False):
+    changed = []
+    skipped = []
+    for item in dir_files:
+        src, dst, size, st = item
+        try:
+            dst_st = os.stat(dst, follow_symlinks=not archive)
+        except FileNotFoundError:
+            dst_st = None
+        if dst_st is not None and is_unchanged(src, dst, st, dst_st, checksum):
+            skipped.append(size)
         else:
-            copy_with_tqdm(src_path, dest_path)
+            changed.append(item)
+    return changed, skipped
+
+def is_unchanged(src, dst, st, dst_st, checksum=None):
+    if st.st_size != dst_st.st_size or stat.S_IFMT(st.st_mode) != stat.S_IFMT(dst_st.st_mode):
+        return False
+    if checksum is None or not stat.S_ISREG(st.st_mode):
+        # Whole seconds, like rsync, so filesystems with coarse timestamps still match.
+        return int(st.st_mtime) == int(dst_st.st_mtime)
+    return file_digest(src, st.st_size, checksum) == file_digest(dst, st.st_size, checksum)
+
+def new_hash():
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+def file_digest(path, size, mode='full'):
+    """Hash the whole file, or with mode 'sampled' only its first, middle and last CHECKSUM_SAMPLE bytes."""
+    digest = new_hash()
+    with open(path, 'rb') as f:
+        if mode == 'sampled' and size > 3 * CHECKSUM_SAMPLE:
+            for offset in (0, size // 2, size - CHECKSUM_SAMPLE):
+                f.seek(offset)
+                digest.update(f.read(CHECKSUM_SAMPLE))
+        else:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    return digest.digest()
+
+def split_hardlinks(files):
+    """Keep one copy per (st_dev, st_ino); return the files to copy and the (first_dst, dst) links to create."""
+    first_paths = {}
+    unique = []
+    links = []
+    for item in files:
+        st = item[3]
+        if st.st_nlink > 1 and stat.S_ISREG(st.st_mode):
+            inode = (st.st_dev, st.st_ino)
+            if inode in first_paths:
+                links.append((first_paths[inode], item[1]))
+                continue
+            first_paths[inode] = item[1]
+        unique.append(item)
+    return unique, links
+
+def copytree_with_progress(source, destination, options=CopyOptions(), disable=False):
+    journal = None
+    if options.resume:
+        journal = CopyJournal(destination)
+    elif os.path.exists(destination) and not options.sync:
+        raise FileExistsError(destination)
+
+    if options.sync:
+        directories, files, skipped = plan_sync(source, destination, options)
+    else:
+        directories, files = scan_tree(source, destination, options.archive)
+    for _, directory, _ in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    links = []
+    if options.archive:
+        files, links = split_hardlinks(files)
+
+    total_size = sum(item[2] for item in files)
+    if options.progress == 'json' and not disable:
+        progress = JsonProgress(total_size, len(files), destination, options.progress_output)
+        if options.sync:
+            progress.extra.update(skipped_files=skipped[0], skipped_bytes=skipped[1])
+    else:
+        progress = tqdm(total=total_size, unit='B', unit_scale=True, unit_divisor=1024,
+                        desc=os.path.basename(os.path.normpath(source)), disable=disable)
+    manifest = None
+    if options.manifest or options.verify:
+        manifest = ChecksumManifest(destination, options.hash, options.jobs)
+    mismatches = []
+    devices = None
+    with progress as pbar:
+        try:
+            if journal is not None:
+                files = journal.pending_files(files, pbar)
+            devices = copy_files(files, pbar, options, journal, manifest)
+        finally:
+            if journal is not None:
+                journal.close()
+            if manifest is not None:
+                manifest.close()
+        if devices and isinstance(pbar, JsonProgress):
+            pbar.extra['devices'] = devices
+        if options.verify:
+            mismatches = manifest.verify(options.jobs)
+            if isinstance(pbar, JsonProgress):
+                pbar.extra.update(verified_files=len(manifest.digests), verify_mismatches=mismatches)
+
+    if manifest is not None and options.manifest:
+        manifest.write(options.manifest)
+
+    if options.archive:
+        for first_dst, dst in links:
+            remove_existing(dst)
+            os.link(first_dst, dst)
+        # Bottom-up, so creating entries inside a directory never touches its restored mtime again.
+        for src_dir, dst_dir, dir_st in reversed(directories):
+            apply_metadata(src_dir, dst_dir, dir_st)
+
+    if journal is not None:
+        journal.remove()
+
+    if options.sync and not disable and options.progress != 'json':
+        print(f"Copied {len(files)} files ({format_size(total_size)}), "
+              f"skipped {skipped[0]} unchanged files ({format_size(skipped[1])}).")
+    if devices and not disable and options.progress != 'json':
+        for row in devices:
+            kind = 'rotational' if row['rotational'] else 'non-rotational'
+            print(f"Device {row['device']} ({kind}): read {format_size(row['read'])}, "
+                  f"wrote {format_size(row['written'])} in {row['seconds']:.2f} s, "
+                  f"{format_size(row['throughput'])}/s")
+    if options.verify and not disable and options.progress != 'json':
+        if mismatches:
+            print(f"Verification failed for {len(mismatches)} of {len(manifest.digests)} files:")
+            for path in mismatches:
+                print(f"  {path}")
+        else:
+            print(f"Verified {len(manifest.digests)} files: all {options.hash} checksums match.")
+    return mismatches
+
+def format_size(size):
+    return tqdm.format_sizeof(size, suffix='B', divisor=1024)
+
+def remove_existing(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def copy_special(src, dst, st):
+    """Recreate a symlink, FIFO or device node instead of copying its contents."""
+    remove_existing(dst)
+    if stat.S_ISLNK(st.st_mode):
+        os.symlink(os.readlink(src), dst)
+    elif stat.S_ISFIFO(st.st_mode):
+        os.mkfifo(dst, stat.S_IMODE(st.st_mode))
+    else:
+        os.mknod(dst, st.st_mode, st.st_rdev)
+
+def copy_xattrs(src, dst, follow_symlinks=True):
+    """Copy extended attributes, which on Linux also carry POSIX ACLs (system.posix_acl_*)."""
+    if not hasattr(os, 'listxattr'):
+        return
+    try:
+        names = os.listxattr(src, follow_symlinks=follow_symlinks)
+    except OSError as e:
+        if e.errno not in XATTR_ERRNOS:
+            raise
+        return
+    for name in names:
+        try:
+            value = os.getxattr(src, name, follow_symlinks=follow_symlinks)
+            os.setxattr(dst, name, value, follow_symlinks=follow_symlinks)
+        except OSError as e:
+            if e.errno not in XATTR_ERRNOS:
+                raise
+
+def apply_metadata(src, dst, st):
+    """Apply ownership, mode, xattrs/ACLs and timestamps from the scan's stat result, without re-statting."""
+    is_link = stat.S_ISLNK(st.st_mode)
+    try:
+        os.chown(dst, st.st_uid, st.st_gid, follow_symlinks=False)
+    except PermissionError:
+        pass  # only root may give files away; keep going like cp -a
+    if not is_link:
+        os.chmod(dst, stat.S_IMODE(st.st_mode))
+    copy_xattrs(src, dst, follow_symlinks=not is_link)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns), follow_symlinks=False)
 
-def copy_with_tqdm(src, dst):
-    total_size = os.path.getsize(src)
-    with tqdm(total=total_size, unit='B', unit_scale=True, unit_divisor=1024, desc=os.path.basename(src)) as pbar:
+def copy_file(item, options=CopyOptions(), journal=None, manifest=None):
+    """Copy one file and return the (processed, written) byte counts of this call."""
+    src, dst, size, st = item
+    needs_copystat = False
+    digest = None
+    if options.archive and not stat.S_ISREG(st.st_mode):
+        copy_special(src, dst, st)
+        result = (size, size)
+    elif options.delta and size >= DELTA_MIN_SIZE and os.path.exists(dst):
+        digest = manifest.new_digest() if manifest is not None else None
+        result = (size, delta_copy(src, dst, size, digest))
+        needs_copystat = True
+    elif journal is not None and size >= RESUMABLE_MIN_SIZE:
+        copied = copy_resumable(src, dst, size, journal)
+        result = (copied, copied)
+        needs_copystat = True
+    elif manifest is not None:
+        digest = manifest.new_digest()
+        copied = copy_hashing(src, dst, digest, manifest.pool)
+        result = (copied, copied)
+        needs_copystat = True
+    elif options.archive:
+        # copyfile instead of copy2: the metadata comes from the scan, not from another stat.
+        shutil.copyfile(src, dst)
+        result = (size, size)
+    else:
         copy2(src, dst)
-        pbar.update(total_size)
+        result = (size, size)
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    if options.archive:
+        apply_metadata(src, dst, st)
+    elif needs_copystat:
+        shutil.copystat(src, dst)
+    if digest is not None:
+        manifest.record(dst, digest)
+    if journal is not None:
+        journal.record_done(dst)
+    return result
+
+def copy_hashing(src, dst, digest, hash_pool):
+    """Copy through two alternating buffers; each chunk is hashed in hash_pool while it is written and the next is read.
+
+    hashlib releases the GIL on large updates, so hashing overlaps the I/O instead of serializing it.
+    """
+    buffers = [memoryview(bytearray(HASH_CHUNK)), memoryview(bytearray(HASH_CHUNK))]
+    pending = None
+    copied = 0
+    index = 0
+    with open(src, 'rb', buffering=0) as fsrc, open(dst, 'wb', buffering=0) as fdst:
+        while True:
+            view = buffers[index]
+            length = fsrc.readinto(view)
+            if pending is not None:
+                pending.result()  # keeps updates in order and frees the other buffer
+            if not length:
+                break
+            chunk = view[:length]
+            pending = hash_pool.submit(digest.update, chunk)
+            written = 0
+            while written < length:
+                written += fdst.write(chunk[written:])
+            copied += length
+            index ^= 1
+    return copied
+
+def delta_copy(src, dst, size, digest=None):
+    """Rewrite only the DELTA_BLOCK blocks of an existing dst that differ from src. Returns the bytes written.
+
+    Every source block is read anyway, so an optional digest is fed from the same buffer.
+    """
+    src_block = bytearray(DELTA_BLOCK)
+    dst_block = bytearray(DELTA_BLOCK)
+    written = 0
+    offset = 0
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_RDWR)
+        try:
+            while offset < size:
+                length = os.preadv(src_fd, [src_block], offset)
+                if not length:
+                    break
+                if digest is not None:
+                    digest.update(memoryview(src_block)[:length])
+                dst_length = os.preadv(dst_fd, [dst_block], offset)
+                # Whole bytearrays compare with memcmp; only the short last block needs slicing.
+                if length == DELTA_BLOCK and dst_length == DELTA_BLOCK:
+                    same = src_block == dst_block
+                else:
+                    same = length == dst_length and src_block[:length] == dst_block[:length]
+                if not same:
+                    os.pwrite(dst_fd, memoryview(src_block)[:length], offset)
+                    written += length
+                offset += length
+            os.ftruncate(dst_fd, offset)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    return written
+
+def copy_resumable(src, dst, size, journal):
+    """Copy a large file in chunks, committing its offset to the journal every RESUMABLE_COMMIT bytes."""
+    offset = journal.partial.get(journal.key(dst), 0)
+    if offset > size or not os.path.exists(dst):
+        offset = 0
+
+    buffer = bytearray(RESUMABLE_CHUNK)
+    view = memoryview(buffer)
+    copied = 0
+    uncommitted = 0
+    with open(src, 'rb') as fsrc, open(dst, 'r+b' if offset else 'wb') as fdst:
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        while True:
+            length = fsrc.readinto(buffer)
+            if not length:
+                break
+            fdst.write(view[:length])
+            copied += length
+            uncommitted += length
+            if uncommitted >= RESUMABLE_COMMIT:
+                fdst.flush()
+                os.fsync(fdst.fileno())
+                journal.record_partial(dst, offset + copied)
+                uncommitted = 0
+        fdst.truncate()
+    return copied
+
+def copy_batch(batch, options=CopyOptions(), journal=None, manifest=None):
+    """Copy a batch of files; returns (processed, written, [(dst, seconds), ...]) for the progress display."""
+    processed = 0
+    written = 0
+    timings = []
+    if options.pipeline:
+        small = [item for item in batch if is_pipelined(item)]
+        if len(small) > 1:
+            processed, timings = copy_tar_stream(small, options, journal, manifest)
+            written = processed
+            batch = [item for item in batch if not is_pipelined(item)]
+    for item in batch:
+        started = time.perf_counter()
+        file_processed, file_written = copy_file(item, options, journal, manifest)
+        timings.append((item[1], time.perf_counter() - started))
+        processed += file_processed
+        written += file_written
+    return processed, written, timings
+
+def is_pipelined(item):
+    return item[2] <= PIPELINE_MAX_SIZE and stat.S_ISREG(item[3].st_mode)
+
+class QueueStream:
+    """File-like pipe between the tar producer and consumer threads, bounded to PIPELINE_QUEUE chunks in memory."""
+
+    def __init__(self):
+        self.chunks = queue.Queue(PIPELINE_QUEUE)
+        self.closed = threading.Event()
+        self._buffer = b''
+        self._offset = 0
+        self._eof = False
+
+    def write(self, data):
+        while True:
+            if self.closed.is_set():
+                raise BrokenPipeError('tar stream consumer stopped')
+            try:
+                self.chunks.put(bytes(data), timeout=0.1)
+                return len(data)
+            except queue.Full:
+                continue
+
+    def finish(self):
+        try:
+            self.chunks.put(None, timeout=1.0)
+        except queue.Full:
+            pass  # the consumer is gone and nobody waits for EOF
+
+    def read(self, size=-1):
+        # Slice the current chunk in place; tarfile asks for 512-byte headers and re-buffering would copy megabytes.
+        parts = []
+        while size != 0 and not self._eof:
+            if self._offset >= len(self._buffer):
+                chunk = self.chunks.get()
+                if chunk is None:
+                    self._eof = True
+                    break
+                self._buffer, self._offset = chunk, 0
+            end = len(self._buffer) if size < 0 else min(len(self._buffer), self._offset + size)
+            parts.append(self._buffer[self._offset:end])
+            if size > 0:
+                size -= end - self._offset
+            self._offset = end
+        return b''.join(parts)
+
+    def close(self):
+        self.closed.set()
+
+def pack_tar_stream(batch, stream):
+    """Producer: pack small files into a PAX tar stream; mode, times and xattrs travel in the headers, like GNU tar."""
+    try:
+        with tarfile.open(fileobj=stream, mode='w|', format=tarfile.PAX_FORMAT, bufsize=PIPELINE_CHUNK) as tar:
+            for src, dst, size, st in batch:
+                with open(src, 'rb') as f:
+                    data = f.read()  # the file may have changed size since the scan; the header must match the data
+                info = tarfile.TarInfo(os.path.basename(dst))
+                info.size = len(data)
+                info.mode = stat.S_IMODE(st.st_mode)
+                info.mtime = st.st_mtime
+                info.pax_headers = {'atime': str(st.st_atime), 'mtime': str(st.st_mtime)}
+                for name, value in read_xattrs(src):
+                    info.pax_headers[XATTR_PAX_PREFIX + name] = value.decode('utf-8', 'surrogateescape')
+                tar.addfile(info, io.BytesIO(data))
+    finally:
+        stream.finish()
+
+def read_xattrs(path):
+    if not hasattr(os, 'listxattr'):
+        return []
+    try:
+        return [(name, os.getxattr(path, name)) for name in os.listxattr(path)]
+    except OSError as e:
+        if e.errno in XATTR_ERRNOS:
+            return []
+        raise
+
+def copy_tar_stream(batch, options=CopyOptions(), journal=None, manifest=None):
+    """Copy small files through an in-memory tar stream: a producer thread reads and packs them while this thread
+    unpacks and writes, so source reads overlap destination round trips.
+
+    The consumer sets mode, times and xattrs through the open descriptor instead of path lookups (copy2 re-resolves
+    the destination path for each of them), which is what dominates on NFS/SSHFS mounts.
+    Returns (processed, [(dst, seconds), ...]).
+    """
+    stream = QueueStream()
+    producer_error = []
+
+    def produce():
+        try:
+            pack_tar_stream(batch, stream)
+        except BaseException as e:
+            producer_error.append(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    processed = 0
+    timings = []
+    items = iter(batch)
+    try:
+        with tarfile.open(fileobj=stream, mode='r|', bufsize=PIPELINE_CHUNK) as tar:
+            for member in tar:
+                started = time.perf_counter()
+                src, dst, size, st = next(items)
+                data = tar.extractfile(member).read()
+                fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, member.mode)
+                try:
+                    view = memoryview(data)
+                    written = 0
+                    while written < len(data):
+                        written += os.write(fd, view[written:])
+                    if options.archive:
+                        apply_metadata(src, dst, st)
+                    else:
+                        if member.mode & ~UMASK != member.mode:
+                            os.chmod(fd, member.mode)  # only when the umask stripped bits at creation
+                        for key, value in member.pax_headers.items():
+                            if key.startswith(XATTR_PAX_PREFIX):
+                                try:
+                                    os.setxattr(fd, key[len(XATTR_PAX_PREFIX):], value.encode('utf-8', 'surrogateescape'))
+                                except OSError as e:
+                                    if e.errno not in XATTR_ERRNOS:
+                                        raise
+                        os.utime(fd, (float(member.pax_headers['atime']), float(member.pax_headers['mtime'])))
+                finally:
+                    os.close(fd)
+                if manifest is not None:
+                    digest = manifest.new_digest()
+                    digest.update(data)
+                    manifest.record(dst, digest)
+                if journal is not None:
+                    journal.record_done(dst)
+                processed += size
+                timings.append((dst, time.perf_counter() - started))
+    except tarfile.ReadError:
+        if not producer_error:
+            raise
+    finally:
+        stream.close()
+        producer.join()
+    if producer_error:
+        raise producer_error[0]
+    return processed, timings
+
+def current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+UMASK = current_umask()  # read once at import: os.umask() is process-wide and racy once workers run
+
+def batch_files(files, max_bytes=BATCH_BYTES, max_files=BATCH_FILES):
+    """Group files into batches so that small files do not pay one task hand-off each."""
+    batch = []
+    batch_size = 0
+    for item in files:
+        batch.append(item)
+        batch_size += item[2]
+        if batch_size >= max_bytes or len(batch) >= max_files:
+            yield batch
+            batch = []
+            batch_size = 0
+    if batch:
+        yield batch
+
+def copy_files(files, pbar, options=CopyOptions(), journal=None, manifest=None):
+    written = 0
+    record_files = getattr(pbar, 'record_files', None)
+
+    def report(result):
+        nonlocal written
+        pbar.update(result[0])
+        if options.delta:
+            written += result[1]
+            pbar.set_postfix_str(f"written {format_size(written)}")
+        if record_files is not None:
+            record_files(result[2])
+
+    if options.schedule == 'device':
+        return copy_by_device(files, report, options, journal, manifest)
+
+    if options.jobs <= 1:
+        # The tar pipeline needs several files per stream; otherwise report file by file.
+        for batch in batch_files(files) if options.pipeline else ([item] for item in files):
+            report(copy_batch(batch, options, journal, manifest))
+        return None
+
+    # Workers only copy; the progress bar is updated from this thread as batches complete.
+    with ThreadPoolExecutor(max_workers=options.jobs) as executor:
+        futures = [executor.submit(copy_batch, batch, options, journal, manifest) for batch in batch_files(files)]
+        for future in as_completed(futures):
+            report(future.result())
+    return None
+
+def is_rotational(device):
+    """True for spinning disks according to sysfs; False for SSDs, NVMe and anything that is not a block device."""
+    base = f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+    # Partitions have no queue of their own; '..' resolves to the whole disk.
+    for path in (os.path.join(base, 'queue', 'rotational'), os.path.join(base, '..', 'queue', 'rotational')):
+        try:
+            with open(path) as f:
+                return f.read().strip() == '1'
+        except OSError:
+            continue
+    return False
+
+class DeviceStats:
+    """Bytes read and written per device, and the wall time during which each device had work."""
+
+    def __init__(self):
+        self.devices = {}
+        self._lock = threading.Lock()
+
+    def add(self, src_dev, dst_dev, length, started, finished):
+        with self._lock:
+            for device, field in ((src_dev, 'read'), (dst_dev, 'written')):
+                entry = self.devices.setdefault(device, {'read': 0, 'written': 0, 'start': started, 'end': finished})
+                entry[field] += length
+                entry['start'] = min(entry['start'], started)
+                entry['end'] = max(entry['end'], finished)
+
+    def report(self, rotational):
+        rows = []
+        for device, entry in sorted(self.devices.items()):
+            seconds = max(entry['end'] - entry['start'], 1e-9)
+            rows.append({
+                'device': f"{os.major(device)}:{os.minor(device)}",
+                'rotational': rotational[device],
+                'read': entry['read'],
+                'written': entry['written'],
+                'seconds': round(seconds, 3),
+                'throughput': round((entry['read'] + entry['written']) / seconds),
+            })
+        return rows
+
+def copy_by_device(files, report, options=CopyOptions(), journal=None, manifest=None):
+    """Group files by (source st_dev, destination st_dev) and give every group its own bounded worker pool.
+
+    Rotating disks get one worker and inode-ordered files, so their heads move sequentially; other devices get
+    options.jobs workers for a deep queue. A semaphore per device bounds devices shared by several groups.
+    Returns the per-device throughput report.
+    """
+    dst_devices = {}
+    groups = {}
+    for item in files:
+        dst_dir = os.path.dirname(item[1])
+        if dst_dir not in dst_devices:
+            dst_devices[dst_dir] = os.stat(dst_dir).st_dev
+        groups.setdefault((item[3].st_dev, dst_devices[dst_dir]), []).append(item)
+
+    devices = {device for key in groups for device in key}
+    rotational = {device: is_rotational(device) for device in devices}
+    limits = {device: 1 if rotational[device] else options.jobs for device in devices}
+    semaphores = {device: threading.BoundedSemaphore(limits[device]) for device in devices}
+    stats = DeviceStats()
+
+    def run(batch, src_dev, dst_dev):
+        held = sorted({src_dev, dst_dev})  # fixed order, so groups sharing devices cannot deadlock
+        for device in held:
+            semaphores[device].acquire()
+        try:
+            started = time.monotonic()
+            result = copy_batch(batch, options, journal, manifest)
+            stats.add(src_dev, dst_dev, result[0], started, time.monotonic())
+        finally:
+            for device in reversed(held):
+                semaphores[device].release()
+        return result
+
+    executors = []
+    futures = []
+    try:
+        for (src_dev, dst_dev), group in groups.items():
+            workers = min(limits[src_dev], limits[dst_dev])
+            if workers == 1:
+                group.sort(key=lambda item: item[3].st_ino)
+            executor = ThreadPoolExecutor(max_workers=workers)
+            executors.append(executor)
+            futures.extend(executor.submit(run, batch, src_dev, dst_dev) for batch in batch_files(group))
+        for future in as_completed(futures):
+            report(future.result())
+    finally:
+        for executor in executors:
+            executor.shutdown()
+    return stats.report(rotational)
+
+def make_benchmark_tree(root, file_count, file_size):
+    os.makedirs(root)
+    payload = os.urandom(file_size) if file_size <= 1024 * 1024 else None
+    for i in range(file_count):
+        directory = os.path.join(root, f"dir{i % 64:02d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file{i:06d}"), 'wb') as f:
+            if payload is not None:
+                f.write(payload)
+            else:
+                for _ in range(file_size // (1024 * 1024)):
+                    f.write(os.urandom(1024 * 1024))
+
+def benchmark(jobs):
+    scenarios = [
+        ("many small files", 20000, 4 * 1024),
+        ("few huge files", 4, 256 * 1024 * 1024),
+    ]
+    workdir = tempfile.mkdtemp(prefix="copy-progress-bench-")
+    try:
+        for name, file_count, file_size in scenarios:
+            source = os.path.join(workdir, "source")
+            make_benchmark_tree(source, file_count, file_size)
+            total_mb = file_count * file_size / (1024 * 1024)
+            print(f"{name}: {file_count} files, {total_mb:.0f} MiB")
+            runs = [
+                ("serial", 1, False),
+                (f"parallel ({jobs} jobs)", jobs, False),
+                ("parallel + journal", jobs, True),
+            ]
+            for label, run_jobs, resume in runs:
+                destination = os.path.join(workdir, "destination")
+                start = time.perf_counter()
+                copytree_with_progress(source, destination, CopyOptions(jobs=run_jobs, resume=resume), disable=True)
+                elapsed = time.perf_counter() - start
+                print(f"  {label:<22} {elapsed:8.2f} s  {file_count / elapsed:10.0f} files/s  {total_mb / elapsed:8.1f} MiB/s")
+                shutil.rmtree(destination)
+            shutil.rmtree(source)
+        benchmark_archive(workdir, jobs)
+        benchmark_pipeline(workdir, jobs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def make_archive_tree(root, file_count):
+    """Small files with varied modes, hardlinks, symlinks, xattrs and old directory timestamps."""
+    make_benchmark_tree(root, file_count, 4 * 1024)
+    for i in range(0, file_count, 10):
+        path = os.path.join(root, f"dir{i % 64:02d}", f"file{i:06d}")
+        os.chmod(path, 0o640 if i % 20 else 0o755)
+        os.link(path, path + ".hardlink")
+        os.symlink(os.path.basename(path), path + ".symlink")
+        try:
+            os.setxattr(path, 'user.benchmark', str(i).encode())
+        except (AttributeError, OSError):
+            pass
+    for name in os.listdir(root):
+        os.utime(os.path.join(root, name), (1000000000, 1000000000))
+
+def tree_metadata(root):
+    """Map each relative path to the metadata --archive promises to keep."""
+    inodes = {}
+    metadata = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            path = os.path.join(dirpath, name)
+            st = os.lstat(path)
+            link_group = inodes.setdefault((st.st_dev, st.st_ino), os.path.relpath(path, root))
+            xattrs = sorted(os.listxattr(path, follow_symlinks=False)) if hasattr(os, 'listxattr') else []
+            target = os.readlink(path) if stat.S_ISLNK(st.st_mode) else None
+            metadata[os.path.relpath(path, root)] = (st.st_mode, st.st_uid, st.st_gid, st.st_size, st.st_mtime_ns,
+                                                     link_group, tuple(xattrs), target)
+    return metadata
+
+def benchmark_archive(workdir, jobs, file_count=20000):
+    source = os.path.join(workdir, "source")
+    make_archive_tree(source, file_count)
+    expected = tree_metadata(source)
+    print(f"archive mode: {len(expected)} entries with hardlinks, symlinks and xattrs")
+
+    runs = [
+        (f"--archive ({jobs} jobs)", lambda dst: copytree_with_progress(source, dst, CopyOptions(jobs=jobs, archive=True), disable=True)),
+        ("cp -a", lambda dst: subprocess.run(['cp', '-a', source, dst], check=True)),
+    ]
+    for label, run in runs:
+        destination = os.path.join(workdir, "destination")
+        start = time.perf_counter()
+        run(destination)
+        elapsed = time.perf_counter() - start
+        copied = tree_metadata(destination)
+        mismatches = sum(1 for path, meta in expected.items() if copied.get(path) != meta)
+        print(f"  {label:<22} {elapsed:8.2f} s  {len(expected) / elapsed:10.0f} entries/s  metadata mismatches: {mismatches}")
+        shutil.rmtree(destination)
+    shutil.rmtree(source)
+
+class SlowFilesystem:
+    """Slow-filesystem simulator: while active, every open/chmod/utime/xattr/mkdir on a path below root, or on a file
+    descriptor of a file below root, sleeps for latency seconds, like a metadata round trip to an NFS or SSHFS server.
+    Calls on the source tree stay fast, so only the destination round trips are measured.
+
+    Built on sys.addaudithook, so it sees the calls made inside shutil as well; the hook cannot be removed and is
+    simply inert while no simulator is active.
+    """
+    active = None
+    events = {'open', 'os.chmod', 'os.chown', 'os.utime', 'os.mkdir', 'os.setxattr', 'os.listxattr', 'os.getxattr'}
+    _installed = False
+
+    def __init__(self, root, latency):
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.calls = 0
+
+    def __enter__(self):
+        if not SlowFilesystem._installed:
+            sys.addaudithook(SlowFilesystem._hook)
+            SlowFilesystem._installed = True
+        self.calls = 0
+        SlowFilesystem.active = self
+        return self
+
+    def __exit__(self, *exc):
+        SlowFilesystem.active = None
+
+    def covers(self, path):
+        if isinstance(path, int):
+            try:
+                path = os.readlink(f"/proc/self/fd/{path}")
+            except OSError:
+                return False  # no /proc to tell which file the descriptor is; not counted
+        elif isinstance(path, bytes):
+            path = os.fsdecode(path)
+        elif not isinstance(path, str):
+            return False
+        path = os.path.abspath(path)
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    @staticmethod
+    def _hook(event, args):
+        slow = SlowFilesystem.active
+        if slow is None or event not in SlowFilesystem.events or not args:
+            return
+        if slow.covers(args[0]):
+            slow.calls += 1
+            time.sleep(slow.latency)
+
+def benchmark_pipeline(workdir, jobs, file_count=5000, latency=0.001):
+    source = os.path.join(workdir, "source")
+    make_benchmark_tree(source, file_count, 4 * 1024)
+    print(f"small files to a slow filesystem: {file_count} files, {latency * 1000:.1f} ms per metadata round trip")
+    runs = [
+        ("local, direct", False, None),
+        ("local, --pipeline", True, None),
+        ("slow FS, direct", False, latency),
+        ("slow FS, --pipeline", True, latency),
+    ]
+    for label, pipeline, run_latency in runs:
+        destination = os.path.join(workdir, "destination")
+        options = CopyOptions(jobs=jobs, pipeline=pipeline)
+        slow = SlowFilesystem(destination, run_latency or 0)
+        start = time.perf_counter()
+        if run_latency:
+            with slow:
+                copytree_with_progress(source, destination, options, disable=True)
+        else:
+            copytree_with_progress(source, destination, options, disable=True)
+        elapsed = time.perf_counter() - start
+        round_trips = ""
+        if run_latency:
+            round_trips = f"  destination round trips: {slow.calls} ({slow.calls / file_count:.1f} per file)"
+        print(f"  {label:<22} {elapsed:8.2f} s  {file_count / elapsed:10.0f} files/s{round_trips}")
+        shutil.rmtree(destination)
+    shutil.rmtree(source)
+
+def positive_int(value):
+    """argparse type for counts of workers and threads: an integer of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an integer: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy a directory tree with a progress bar.')
+    parser.add_argument('source', nargs='?', help='Origin directory')
+    parser.add_argument('destination', nargs='?', help='Destination directory (must not exist)')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=DEFAULT_JOBS,
+                        help=f'Number of files copied concurrently (default: {DEFAULT_JOBS})')
+    parser.add_argument('--resume', action='store_true',
+                        help='Keep a copy journal and continue an interrupted copy into an existing destination')
+    parser.add_argument('--sync', action='store_true',
+                        help='Only copy files that are missing or changed in an existing destination')
+    parser.add_argument('--checksum', choices=CHECKSUM_MODES,
+                        help='With --sync, compare contents by hash (sampled blocks or full files) instead of mtime')
+    parser.add_argument('--delta', action='store_true',
+                        help='Implies --sync; rewrite only the changed blocks of large files that already exist')
+    parser.add_argument('-a', '--archive', action='store_true',
+                        help='Preserve ownership, permissions, xattrs/ACLs, hardlinks, symlinks and directory timestamps')
+    parser.add_argument('--progress', choices=PROGRESS_MODES, default='bar',
+                        help='bar: terminal progress bar; json: rate-limited JSON lines plus a final summary')
+    parser.add_argument('--progress-output', metavar='PATH',
+                        help='Write --progress=json lines to this file or FIFO instead of stdout')
+    parser.add_argument('--manifest', metavar='PATH',
+                        help='Hash every copied file while it is in flight and write a checksum manifest to PATH')
+    parser.add_argument('--hash', choices=sorted(HASH_ALGORITHMS), default='blake2b',
+                        help='Manifest hash algorithm (default: blake2b, compatible with b2sum -c)')
+    parser.add_argument('--verify', action='store_true',
+                        help='After copying, re-read the destination in parallel and check it against the in-flight hashes')
+    parser.add_argument('--schedule', choices=SCHEDULES, default='pool',
+                        help='pool: one shared worker pool; device: bounded workers per source/destination device, '
+                             'one for rotating disks (default: pool)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help=f'Pack files up to {PIPELINE_MAX_SIZE // 1024} KiB into in-memory tar streams that a consumer '
+                             'unpacks at the destination; larger files take the direct path')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compare serial and parallel copies on synthetic trees and exit')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(max(args.jobs, 2))
+        return
+
+    if not args.source or not args.destination:
         print("Usage: copy-progress.py Origin destination")
         sys.exit(1)
 
-    source_dir = sys.argv[1]
-    dest_dir = sys.argv[2]
-    copy_with_progress(source_dir, dest_dir)
+    sync = args.sync or args.delta
+    if args.resume and sync:
+        parser.error('--resume cannot be combined with --sync or --delta')
+    if args.resume and (args.manifest or args.verify):
+        parser.error('--manifest and --verify cannot be combined with --resume')
+
+    options = CopyOptions(jobs=args.jobs, resume=args.resume, sync=sync, checksum=args.checksum,
+                          delta=args.delta, archive=args.archive, progress=args.progress,
+                          progress_output=args.progress_output, manifest=args.manifest, hash=args.hash,
+                          verify=args.verify, schedule=args.schedule, pipeline=args.pipeline)
+    copy_with_progress(args.source, args.destination, options)
+
+if __name__ == "__main__":
+    main()
@@ -8,38 +8,63 @@ utilizing various libraries for image processing and data manipulation. It resiz
 extracts the color information, and either prints the hexadecimal color codes or saves them to a specified output file. 
 The script also handles command-line arguments for input and output file paths, ensuring that the specified image file 
 exists before processing. The resulting color data is organized in a DataFrame for easy access and manipulation.
+The image is decoded and resized in memory, with no temporary file: JPEGs are downscaled in the DCT domain by 'draft()' 
+and by integer factors with 'reduce()' before the final LANCZOS resize. '--benchmark <image>' times this against the 
+previous save-and-reload pipeline.
+The colors are extracted by the NumPy palette engine in 'palette_engine.py' (next to this script, shared with 
+'extract-color-palette.py'), which has the semantics of 'extcolors' (same tolerance, limit, colors and occurrences).
+'batch <dir|glob|image>...' extracts the palettes of many images on a pool of worker processes ('-j N', one per CPU by 
+default), each started once with its imports and tables loaded, and streams one row per image, as they finish, into a 
+single JSONL (default, also on stdout), CSV or Parquet file ('-o palettes.csv'); '--benchmark' reports images/s per 
+worker count. pandas and colormap are only imported by the single-image path.
 
 Dependencies:
-1. 'numpy' - Third-party library for numerical operations (install via pip).
+1. 'palette_engine.py' - The shared palette engine, next to this script; it needs 'numpy' (install via pip).
 2. 'pandas' - Third-party library for data manipulation and analysis (install via pip).
-3. 'matplotlib' - Third-party library for plotting and visualization (install via pip).
-4. 'Pillow' (PIL) - Third-party library for image processing (install via pip).
-5. 'OpenCV' (cv2) - Third-party library for computer vision tasks (install via pip).
-6. 'extcolors' - Third-party library for extracting dominant colors from images (install via pip).
-7. 'colormap' - Third-party library for color conversion (install via pip).
-8. 'os' - Native library for interacting with the operating system (no installation needed).
-9. 'sys' - Native library for system-specific parameters and functions (no installation needed).
+3. 'Pillow' (PIL) - Third-party library for image processing (install via pip).
+4. 'colormap' - Third-party library for color conversion (install via pip).
+5. 'pyarrow' - Optional, for Parquet output in batch mode (install via pip).
+6. 'os' - Native library for interacting with the operating system (no installation needed).
+7. 'sys' / 'itertools' / 'tempfile' / 'statistics' / 'time' / 'csv' / 'json' / 'glob' / 'argparse' / 
+   'subprocess' / 'concurrent.futures' - Native libraries (no installation needed).
 
 Installation of Dependencies:
 - Install the required libraries using pip:
   
-  pip install numpy pandas matplotlib Pillow opencv-python extcolors colormap
+  pip install numpy pandas Pillow colormap pyarrow
 """
 
 import os
 import sys
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import matplotlib.image as mpimg
-from PIL import Image, ImageFilter
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-import cv2
-import extcolors
-from colormap import rgb2hex
+import csv
+import glob
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+import itertools
+from PIL import Image
+from palette_engine import extract_from_image, extract_from_path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+OUTPUT_WIDTH = 900
+REDUCE_GAP = 2
+BENCHMARK_RUNS = 5
+
+DEFAULT_JOBS = os.cpu_count() or 1
+BATCH_FORMATS = ('jsonl', 'csv', 'parquet')
+BATCH_IN_FLIGHT = 4  # queued images per worker, so results stream out without submitting 80k futures at once
+PARQUET_ROW_GROUP = 1024
+PROGRESS_INTERVAL = 1.0
 
 def color_to_df(input):
+    # Imported here: pandas and colormap (which loads matplotlib.pyplot) take most of a second, and batch mode needs
+    # neither.
+    import pandas as pd
+    from colormap import rgb2hex
+
     colors_pre_list = str(input).replace('([(','').split(', (')[0:-1]
     df_rgb = [i.split('), ')[0] + ')' for i in colors_pre_list]
     df_percent = [i.split('), ')[1].replace(')','') for i in colors_pre_list]
@@ -52,18 +77,55 @@ def color_to_df(input):
     df = pd.DataFrame(zip(df_color_up, df_percent), columns=['c_code', 'occurence'])
     return df
 
-def extract_hex_colors(input_name, output_name=None):
-    output_width = 900
+def load_resized(input_name, output_width=OUTPUT_WIDTH):
+    """Open an image scaled to output_width, in memory.
+
+    JPEG decoders can scale by 1/2, 1/4 or 1/8 in the DCT domain, so draft() decodes a 24 MP photo at roughly the
+    target size instead of in full; reduce() then box-shrinks by an integer factor while keeping REDUCE_GAP times the
+    target for the final LANCZOS pass.
+    """
+    img = Image.open(input_name)
+    wpercent = (output_width / float(img.size[0]))
+    hsize = int((float(img.size[1]) * float(wpercent)))
+    img.draft('RGB', (output_width, hsize))
+    factor = min(img.size[0] // output_width, img.size[1] // max(hsize, 1)) // REDUCE_GAP
+    if factor > 1:
+        img = img.reduce(factor)
+    return img.resize((output_width, hsize), Image.LANCZOS)
+
+def disk_round_trip(input_name, output_width=OUTPUT_WIDTH):
+    """The previous pipeline, kept for --benchmark: full decode, resize, encode to disk, decode again, delete."""
     img = Image.open(input_name)
     wpercent = (output_width / float(img.size[0]))
     hsize = int((float(img.size[1]) * float(wpercent)))
     img = img.resize((output_width, hsize), Image.LANCZOS)
-    
-    # Save resized image
-    resize_name = 'resize_' + input_name
-    img.save(resize_name)
-    
-    colors_x = extcolors.extract_from_path(resize_name, tolerance=12, limit=12)
+    fd, resize_name = tempfile.mkstemp(suffix=os.path.splitext(input_name)[1])
+    os.close(fd)
+    try:
+        img.save(resize_name)
+        return extract_from_path(resize_name, tolerance=12, limit=12)
+    finally:
+        os.remove(resize_name)
+
+def benchmark(input_name, runs=BENCHMARK_RUNS):
+    with Image.open(input_name) as img:
+        print(f"{input_name}: {img.size[0]}x{img.size[1]} {img.format}, median of {runs} runs")
+    pipelines = [('disk round trip', lambda: disk_round_trip(input_name)),
+                 ('in memory', lambda: extract_from_image(load_resized(input_name), tolerance=12, limit=12))]
+    palettes = []
+    for label, pipeline in pipelines:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            colors_x = pipeline()
+            times.append(time.perf_counter() - start)
+        palettes.append([color for color, _ in colors_x[0]])
+        print(f"  {label:<16} {statistics.median(times) * 1000:8.0f} ms per image")
+    shared = len(set(palettes[0]) & set(palettes[1]))
+    print(f"  {shared} of {len(palettes[0])} palette colors identical (the old path also re-encoded the resized image)")
+
+def extract_hex_colors(input_name, output_name=None):
+    colors_x = extract_from_image(load_resized(input_name), tolerance=12, limit=12)
     df_color = color_to_df(colors_x)
     
     if output_name:
@@ -73,29 +135,250 @@ def extract_hex_colors(input_name, output_name=None):
         # Print hex codes
         print(df_color)
     
-    # Remove resized image file
-    os.remove(resize_name)
-    
     return df_color
 
-# Check if an image file path is provided
-if len(sys.argv) < 2:
-    print("Usage: python script.py <image_path> [output_file]")
-    print("Please provide the path to the image file.")
-    sys.exit(1)
+def hex_code(rgb):
+    # colormap.rgb2hex's format, without importing colormap in the workers
+    return '#%02X%02X%02X' % rgb
+
+def image_suffixes():
+    Image.init()
+    return {suffix for suffix, name in Image.registered_extensions().items() if name in Image.OPEN}
+
+def expand_images(patterns):
+    """Expand globs (also when quoted) and directories (recursively, image files only) into a sorted list of paths.
+
+    A file given by name is taken whatever its suffix.
+    """
+    suffixes = image_suffixes()
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+        elif os.path.isdir(pattern):
+            matches = [os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names
+                       if os.path.splitext(name)[1].lower() in suffixes]
+        else:
+            matches = [pattern]
+        paths.extend(sorted(matches))
+    return paths
+
+batch_settings = None
+
+def init_batch_worker(settings):
+    """Pool initializer: runs once per worker process, so every image after the first finds Pillow's format plugins
+    and the Lab tables already loaded."""
+    global batch_settings
+    batch_settings = settings
+    Image.init()
+
+def batch_palette(path):
+    """Palette of one image for the batch writer: a row dict, with 'error' set instead of raising."""
+    width, tolerance, limit = batch_settings
+    started = time.perf_counter()
+    row = {'path': path, 'width': None, 'height': None, 'colors': [], 'occurrences': [], 'error': None}
+    try:
+        with Image.open(path) as img:
+            row['width'], row['height'] = img.size
+            colors_x, _ = extract_from_image(load_resized(path, width), tolerance=tolerance, limit=limit)
+        row['colors'] = [hex_code(rgb) for rgb, _ in colors_x]
+        row['occurrences'] = [occurrence for _, occurrence in colors_x]
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['seconds'] = round(time.perf_counter() - started, 4)
+    return row
+
+class BatchWriter:
+    """One output file for the whole batch, written as results arrive: JSONL and CSV line by line (flushed, so the
+    file can be tailed), Parquet in row groups of PARQUET_ROW_GROUP images."""
+
+    def __init__(self, output, output_format):
+        self.output_format = output_format
+        self.rows = []
+        self.parquet = None
+        if output_format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+            self.pyarrow = pyarrow
+            self.schema = pyarrow.schema([('path', pyarrow.string()), ('width', pyarrow.int32()),
+                                          ('height', pyarrow.int32()), ('colors', pyarrow.list_(pyarrow.string())),
+                                          ('occurrences', pyarrow.list_(pyarrow.int64())),
+                                          ('error', pyarrow.string()), ('seconds', pyarrow.float64())])
+            self.parquet = pyarrow.parquet.ParquetWriter(output, self.schema)
+            self.file = None
+            return
+        self.file = sys.stdout if output in (None, '-') else open(output, 'w', newline='')
+        if output_format == 'csv':
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(['path', 'width', 'height', 'colors', 'occurrences', 'error', 'seconds'])
+
+    def write(self, row):
+        if self.parquet is not None:
+            self.rows.append(row)
+            if len(self.rows) >= PARQUET_ROW_GROUP:
+                self.flush_row_group()
+            return
+        if self.output_format == 'csv':
+            self.csv.writerow([row['path'], row['width'], row['height'], ' '.join(row['colors']),
+                               ' '.join(map(str, row['occurrences'])), row['error'] or '', row['seconds']])
+        else:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+    def flush_row_group(self):
+        if self.rows:
+            self.parquet.write_table(self.pyarrow.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        if self.parquet is not None:
+            self.flush_row_group()
+            self.parquet.close()
+        elif self.file is not sys.stdout:
+            self.file.close()
+
+def output_format_for(output, requested=None):
+    if requested:
+        return requested
+    suffix = os.path.splitext(output or '')[1].lower().lstrip('.')
+    return {'json': 'jsonl', 'ndjson': 'jsonl', 'pq': 'parquet'}.get(suffix, suffix if suffix in BATCH_FORMATS else 'jsonl')
+
+def run_batch(paths, writer, jobs=DEFAULT_JOBS, width=OUTPUT_WIDTH, tolerance=12, limit=12, quiet=False):
+    """Extract the palettes of paths on a pool of jobs worker processes, handing each row to writer as soon as it is
+    ready (completion order, not input order). Returns (images done, failures, seconds)."""
+    workers = max(1, min(jobs, len(paths)))
+    pending = iter(paths)
+    done = failures = 0
+    started = last_report = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                             initargs=((width, tolerance, limit),)) as executor:
+        running = {executor.submit(batch_palette, path) for path in itertools.islice(pending, workers * BATCH_IN_FLIGHT)}
+        while running:
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                row = future.result()
+                writer.write(row)
+                done += 1
+                if row['error']:
+                    failures += 1
+                    if not quiet:
+                        print(f"\nFAILED {row['path']}: {row['error']}", file=sys.stderr)
+            running |= {executor.submit(batch_palette, path) for path in itertools.islice(pending, len(finished))}
+            now = time.perf_counter()
+            if not quiet and (now - last_report >= PROGRESS_INTERVAL or not running):
+                last_report = now
+                print(f"\r[{done}/{len(paths)}] {done / (now - started):.1f} images/s, {workers} worker(s)",
+                      end='\n' if not running else '', file=sys.stderr, flush=True)
+    return done, failures, time.perf_counter() - started
+
+def one_process_per_image(paths):
+    """The previous way to cover many images: one launch of this script, with its interpreter start-up and pandas and
+    colormap imports, per image."""
+    script = os.path.abspath(__file__)
+    started = time.perf_counter()
+    for path in paths:
+        subprocess.run([sys.executable, script, path, os.devnull],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+def batch_benchmark(paths, jobs):
+    """images/s for 1, 2, 4, ... jobs worker processes, against launching the script once per image."""
+    print(f"{len(paths)} images, up to {jobs} worker(s) on {os.cpu_count()} CPU(s)")
+    sample = paths[:min(len(paths), 8)]
+    seconds = one_process_per_image(sample)
+    print(f"  one process per image (first {len(sample)}) {len(sample) / seconds:8.1f} images/s")
+    counts = sorted({1, jobs} | {2 ** i for i in range(1, jobs.bit_length()) if 2 ** i < jobs})
+    baseline = None
+    for count in counts:
+        writer = BatchWriter(os.devnull, 'jsonl')
+        try:
+            done, _, seconds = run_batch(paths, writer, count, quiet=True)
+        finally:
+            writer.close()
+        rate = done / seconds
+        baseline = baseline or rate
+        print(f"  batch -j {count:<3} {seconds:7.2f} s {rate:8.1f} images/s  x{rate / baseline:.2f}")
+
+def positive_int(value):
+    """argparse type for worker counts, widths and color limits: an integer of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an integer: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return number
+
+def batch_command(argv):
+    parser = argparse.ArgumentParser(prog=f"{os.path.basename(sys.argv[0])} batch",
+                                     description='Extract the palettes of many images on a pool of worker processes '
+                                                 'and stream them, as they finish, into one JSONL, CSV or Parquet file.')
+    parser.add_argument('inputs', nargs='+', metavar='input',
+                        help='Image files, directories (searched recursively) or (quoted) globs, e.g. "shop/**/*.jpg"')
+    parser.add_argument('-o', '--output', help="Output file, format from its suffix (default: JSONL on stdout)")
+    parser.add_argument('-f', '--format', choices=BATCH_FORMATS, help='Output format, overriding the suffix')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=DEFAULT_JOBS,
+                        help=f'Worker processes (default: {DEFAULT_JOBS})')
+    parser.add_argument('--width', type=positive_int, default=OUTPUT_WIDTH,
+                        help=f'Width images are resized to before the analysis (default: {OUTPUT_WIDTH})')
+    parser.add_argument('--tolerance', type=int, default=12, help='CIE76 merge tolerance (default: 12)')
+    parser.add_argument('--limit', type=positive_int, default=12, help='Colors per image (default: 12)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='No progress line or per-image errors on stderr')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Measure images/s for 1, 2, 4, ... up to --jobs workers on the inputs and exit')
+    args = parser.parse_args(argv)
+
+    paths = expand_images(args.inputs)
+    if not paths:
+        print(f"No images match: {' '.join(args.inputs)}", file=sys.stderr)
+        return 1
+    if args.benchmark:
+        batch_benchmark(paths, args.jobs)
+        return 0
+
+    writer = BatchWriter(args.output, output_format_for(args.output, args.format))
+    try:
+        done, failures, seconds = run_batch(paths, writer, args.jobs, args.width, args.tolerance, args.limit, args.quiet)
+    finally:
+        writer.close()
+    if not args.quiet:
+        print(f"{done} images in {seconds:.2f} s ({done / seconds:.1f} images/s), {failures} failed.", file=sys.stderr)
+    return 1 if failures else 0
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(batch_command(sys.argv[2:]))
+
+    if len(sys.argv) > 2 and sys.argv[1] == '--benchmark':
+        benchmark(sys.argv[2])
+        sys.exit(0)
+
+    # Check if an image file path is provided
+    if len(sys.argv) < 2:
+        print("Usage: python script.py <image_path> [output_file]")
+        print("       python script.py --benchmark <image_path>")
+        print("       python script.py batch [-o palettes.jsonl|.csv|.parquet] [-j N] <dir|glob|image>...")
+        print("Please provide the path to the image file.")
+        sys.exit(1)
+
+    # Get the image file path from command line arguments
+    input_name = sys.argv[1]
 
-# Get the image file path from command line arguments
-input_name = sys.argv[1]
+    # Check if the image file exists
+    if not os.path.isfile(input_name):
+        print("The specified image file does not exist.")
+        sys.exit(1)
 
-# Check if the image file exists
-if not os.path.isfile(input_name):
-    print("The specified image file does not exist.")
-    sys.exit(1)
+    # Get the output file name from command line arguments, if provided
+    output_name = None
+    if len(sys.argv) > 2:
+        output_name = sys.argv[2]
 
-# Get the output file name from command line arguments, if provided
-output_name = None
-if len(sys.argv) > 2:
-    output_name = sys.argv[2]
+    # Extract hex colors from the image
+    extract_hex_colors(input_name, output_name)
 
-# Extract hex colors from the image
-df_color = extract_hex_colors(input_name, output_name)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
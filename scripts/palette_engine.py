@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# License: GPLv3
+# Credits: Felipe Facundes
+
+"""
+Palette engine shared by 'extract-color-palette.py' and 'extract-colorcode-hexadecimal.py' (both import it from this 
+directory). It keeps the semantics of 'extcolors' (same CIE76 tolerance, limit and greedy merge, same colors and 
+occurrences) but is vectorized: pixels are packed into uint32 and counted with 'bincount' (or 'np.unique' on small 
+images), converted to L*a*b* in one pass and merged through a grid of Lab cells.
+
+Dependencies:
+1. 'numpy' - Third-party library for the vectorized palette engine (install via pip).
+2. 'PIL' (Pillow) - Third-party library for image processing (install via pip).
+3. 'math' / 'heapq' / 'itertools' - Native libraries (no installation needed).
+
+Installation of Dependencies:
+- Install 'numpy' and 'Pillow' using pip:
+
+  pip install numpy Pillow
+"""
+
+import math
+import heapq
+import itertools
+import numpy as np
+from PIL import Image
+
+DEFAULT_TOLERANCE = 32  # extcolors' default
+CIE76_CELL_MIN = 1.0
+BINCOUNT_MIN_PIXELS = 2 * 1024 * 1024
+
+def exact_pow(values, exponent):
+    # math.pow, as extcolors uses, element by element in C: numpy's vectorized pow may differ in the last bit, which
+    # could move a color pair across the tolerance.
+    return np.fromiter(map(math.pow, values.ravel().tolist(), itertools.repeat(exponent)),
+                       dtype=np.float64, count=values.size).reshape(values.shape)
+
+CHANNEL = np.arange(256) / 255.0
+LINEAR_CHANNEL = np.where(CHANNEL <= 0.04045, CHANNEL / 12.92, exact_pow((CHANNEL + 0.055) / 1.055, 2.4))
+
+def rgb_to_lab(rgb):
+    """CIE L*a*b* (D65, 2°) of an (n, 3) array of 8-bit sRGB colors, with the constants and operation order of
+    extcolors, so a tolerance means exactly what it meant before."""
+    linear = LINEAR_CHANNEL[rgb]
+    r, g, b = linear[:, 0], linear[:, 1], linear[:, 2]
+    x = (r * 0.4124564 + g * 0.3575761 + b * 0.1804375) * 100.0
+    y = (r * 0.2126729 + g * 0.7151522 + b * 0.0721750) * 100.0
+    z = (r * 0.0193339 + g * 0.1191920 + b * 0.9503041) * 100.0
+    xyz = np.stack((x / 95.047, y / 100.000, z / 108.883), axis=1)
+    xyz = np.where(xyz > 0.008856, exact_pow(xyz, 0.3333333), ((xyz * 903.3) + 16.0) / 116.0)
+    x, y, z = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    return np.stack((np.maximum(0.0, (116.0 * y) - 16.0), (x - y) * 500.0, (y - z) * 200.0), axis=1)
+
+def count_colors(pixels):
+    """Unique colors of an (h, w, 4) RGBA array, ignoring fully transparent pixels.
+
+    Each pixel is read as one little-endian uint32 (alpha in the top byte, 0xBBGGRR below), counted with bincount
+    over the 2^24 colors (np.unique on small images, where sorting beats clearing 2^24 counters), and ordered by
+    count and then by first appearance, like extcolors' stable sort. Returns the (n, 3) RGB colors and their counts.
+    """
+    packed = np.ascontiguousarray(pixels).view('<u4').ravel()
+    packed = packed[packed >= 1 << 24] & 0xFFFFFF
+    if len(packed) < BINCOUNT_MIN_PIXELS:
+        colors, first, counts = np.unique(packed, return_index=True, return_counts=True)
+    else:
+        counts = np.bincount(packed, minlength=1 << 24)
+        colors = np.flatnonzero(counts)
+        first = np.full(1 << 24, len(packed), dtype=np.int64)
+        np.minimum.at(first, packed, np.arange(len(packed)))
+        first, counts = first[colors], counts[colors]
+    order = np.lexsort((first, -counts))
+    colors = colors[order]
+    rgb = np.stack((colors & 0xFF, (colors >> 8) & 0xFF, colors >> 16), axis=1)
+    return rgb, counts[order]
+
+def merge_colors(lab, counts, tolerance, limit=None):
+    """extcolors' greedy merge: every color, most frequent first, absorbs the later, not yet absorbed colors less than
+    tolerance away (CIE76). Returns the indices of the surviving colors, most frequent first, and the merged counts.
+
+    A grid of tolerance-sized Lab cells limits each comparison to the 27 cells around the color. With a limit, the
+    merge stops once no remaining color, even absorbing everything left, could enter the top 'limit'.
+    """
+    merged = counts.astype(np.int64)
+    if tolerance <= 0:
+        survivors = np.arange(len(counts))
+        return (survivors[:limit] if limit else survivors), merged
+    cell = max(float(tolerance), CIE76_CELL_MIN)
+    grid = np.floor(lab / cell).astype(np.int64) + 512
+    keys = (grid[:, 0] * 1024 + grid[:, 1]) * 1024 + grid[:, 2]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    cells = {int(key): order[start:end] for key, start, end in zip(sorted_keys[starts], starts, np.r_[starts[1:], len(keys)])}
+    neighbors = [(dl * 1024 + da) * 1024 + db for dl in (-1, 0, 1) for da in (-1, 0, 1) for db in (-1, 0, 1)]
+
+    absorbed = np.zeros(len(counts), dtype=bool)
+    remaining = int(merged.sum())
+    survivors = []
+    top = []  # min-heap of the 'limit' largest finished counts
+    for i in range(len(counts)):
+        if absorbed[i]:
+            continue
+        remaining -= int(counts[i])
+        key = int(keys[i])
+        candidates = np.concatenate([cells[key + offset] for offset in neighbors if key + offset in cells])
+        candidates = candidates[candidates > i]
+        candidates = candidates[~absorbed[candidates]]
+        if len(candidates):
+            d = lab[candidates] - lab[i]
+            hits = candidates[np.sqrt((d[:, 0] * d[:, 0]) + (d[:, 1] * d[:, 1]) + (d[:, 2] * d[:, 2])) < tolerance]
+            absorbed[hits] = True
+            gained = int(counts[hits].sum())
+            merged[i] += gained
+            remaining -= gained
+        survivors.append(i)
+        if limit:
+            if len(top) < limit:
+                heapq.heappush(top, int(merged[i]))
+            elif merged[i] > top[0]:
+                heapq.heapreplace(top, int(merged[i]))
+            if len(top) == limit and top[0] >= remaining:
+                break
+    survivors = np.array(survivors, dtype=np.int64)
+    survivors = survivors[np.argsort(-merged[survivors], kind='stable')]
+    return (survivors[:limit] if limit else survivors), merged
+
+def extract_from_image(img, tolerance=DEFAULT_TOLERANCE, limit=None):
+    """Drop-in for extcolors.extract_from_image: ([((r, g, b), occurrence), ...], pixel count)."""
+    pixels = np.asarray(img.convert("RGBA"))
+    rgb, counts = count_colors(pixels)
+    survivors, merged = merge_colors(rgb_to_lab(rgb), counts, tolerance, limit)
+    colors = [(tuple(int(value) for value in rgb[i]), int(merged[i])) for i in survivors]
+    return colors, pixels.shape[0] * pixels.shape[1]
+
+def extract_from_path(path, tolerance=DEFAULT_TOLERANCE, limit=None):
+    return extract_from_image(Image.open(path), tolerance, limit)
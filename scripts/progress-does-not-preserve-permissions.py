@@ -10,15 +10,32 @@ A Python script designed to copy directories with a detailed progress bar, provi
 
 Strong Points:
 1. Progress Tracking: Utilizes tqdm library to display real-time copy progress
-2. Total File Size Calculation: Computes and tracks total transfer size
+2. Total File Size Calculation: A single 'os.scandir' pass builds a compact manifest (path, size, mode, mtime) up front; 
+   it drives one global, byte-accurate progress bar with ETA and is reused for the copy itself, so nothing is re-statted
 3. User-Friendly Interface: Simple command-line usage
-4. Error Handling: Prevents overwriting existing destination directories
-5. Large File Support: Reads and writes files in manageable 1MB chunks
+4. Error Handling: Prevents overwriting existing destination directories (unless '--delta' is given)
+5. Large File Support: Transfers files in manageable 1MB chunks
+6. Zero-Copy Transfers: Tries a reflink clone (FICLONE, btrfs/xfs) first, then the kernel-side 'os.copy_file_range' and 
+   'os.sendfile' paths, so file data never passes through Python. When the kernel paths are unavailable it falls back to 
+   'readinto' with a single reusable buffer instead of allocating a new bytes object per chunk
+7. Block-Level Delta: With '--delta' an existing destination is updated in place; files that already exist there are read 
+   block by block alongside the source (pread) and only the blocks that differ are rewritten (pwrite). The progress bar 
+   counts scanned bytes and shows the bytes actually written next to it
+8. Sparse Files: Holes are found with 'SEEK_DATA'/'SEEK_HOLE' and skipped, then recreated in the destination with a 
+   final truncate, so a 100 GB disk image holding 2 GB of data writes 2 GB. The progress bar counts only data bytes. 
+   '--check-sparse' copies a synthetic sparse file with every backend and exits 1 if a copy differs or allocates more 
+   blocks than the source; '--benchmark' applies the same check to its sparse run
+9. I/O Tuning: '--chunk-size auto' hill-climbs the chunk size (64 KiB to 64 MiB) on the observed throughput, '--direct' 
+   bypasses the page cache with O_DIRECT and page-aligned buffers, and '--drop-cache' calls posix_fadvise(DONTNEED) on 
+   completed ranges so large copies do not evict hot pages (database caches, for example) on busy servers
 
 Capabilities:
 - Copies entire directory structures
 - Shows transfer speed and estimated time remaining
 - Handles large directories and files efficiently
+- '--backend' forces one transfer path (auto, reflink, copy_file_range, sendfile, readinto)
+- '--benchmark' verifies every backend byte-for-byte on a scratch file and reports its throughput, then reports MB/s and 
+  page-cache residency (via mincore) of the source and destination for each I/O tuning mode
 
 Limitation:
 - Does NOT preserve original file permissions during the copy process, which might be a critical consideration for system administrators 
@@ -32,6 +49,9 @@ Dependencies
 2. os - Native library (no installation required)
 3. sys - Native library (no installation required)
 4. shutil - Native library (no installation required)
+5. argparse - Native library (no installation required)
+6. fcntl - Native library, used for the FICLONE reflink ioctl (no installation required)
+7. mmap / ctypes - Native libraries, aligned O_DIRECT buffers and the mincore cache residency probe (no installation required)
 
 ### Installation of Dependencies
 To install the required third-party dependency, run the following command:
@@ -44,36 +64,562 @@ Ensure you have Python 3.x installed on your system.
 
 import os
 import sys
-from shutil import copytree
+import time
+import stat
+import mmap
+import errno
+import ctypes
+import ctypes.util
+import filecmp
+import tempfile
+import argparse
+from functools import partial
+from collections import namedtuple
 from tqdm import tqdm
 
-def copy_with_progress(source, destination):
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+TUNE_SAMPLES = 8
+DIRECT_ALIGNMENT = 4096
+DROP_CACHE_RANGE = 64 * 1024 * 1024
+FICLONE = 0x40049409
+BACKENDS = ['auto', 'reflink', 'copy_file_range', 'sendfile', 'readinto']
+SPARSE_CHECK_MB = 64
+SPARSE_CHECK_STRIDE_MB = 16
+
+# Errors that mean "this transfer path is not available here", not "the copy failed".
+FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP,
+                   errno.EBADF, errno.ETXTBSY, errno.EPERM}
+
+ManifestEntry = namedtuple('ManifestEntry', ['path', 'size', 'mode', 'mtime', 'data'])
+
+class IOTuning:
+    """Chunk sizing and page-cache policy shared by every file of one copy.
+
+    With auto=True the chunk size hill-climbs: it doubles while the throughput measured over TUNE_SAMPLES chunks
+    keeps improving, then tries halving from the start size, and settles on the best size seen.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, auto=False, direct=False, drop_cache=False):
+        self.chunk_size = chunk_size
+        self.auto = auto
+        self.direct = direct
+        self.drop_cache = drop_cache and hasattr(os, 'posix_fadvise')
+        self._start_size = chunk_size
+        self._best_size = chunk_size
+        self._best_rate = 0.0
+        self._factor = 2
+        self._bytes = 0
+        self._elapsed = 0.0
+        self._samples = 0
+        self._buffer = None
+        self._delta_buffers = None
+
+    def record(self, length, elapsed):
+        if not self.auto:
+            return
+        self._bytes += length
+        self._elapsed += elapsed
+        self._samples += 1
+        if self._samples < TUNE_SAMPLES:
+            return
+        rate = self._bytes / max(self._elapsed, 1e-9)
+        self._bytes, self._elapsed, self._samples = 0, 0.0, 0
+        if rate > self._best_rate * 1.05:
+            self._best_rate, self._best_size = rate, self.chunk_size
+        elif self._factor == 2 and self._best_size == self._start_size:
+            self._factor = 0.5
+            self.chunk_size = self._start_size
+        else:
+            self.chunk_size = self._best_size
+            self.auto = False
+            return
+        next_size = int(self.chunk_size * self._factor)
+        if MIN_CHUNK_SIZE <= next_size <= MAX_CHUNK_SIZE:
+            self.chunk_size = next_size
+        else:
+            self.chunk_size = self._best_size
+            self.auto = False
+
+    def buffer(self):
+        """A reusable buffer big enough for any chunk size; page aligned (mmap) so O_DIRECT accepts it."""
+        if self._buffer is None:
+            self._buffer = mmap.mmap(-1, MAX_CHUNK_SIZE if self.auto else align_up(self.chunk_size))
+        return memoryview(self._buffer)
+
+    def delta_buffers(self):
+        """Source and destination block buffers for --delta, one chunk each. bytearrays rather than views of the
+        mmap: two bytearrays compare with a single memcmp, memoryviews item by item, about 75 times slower."""
+        if self._delta_buffers is None or len(self._delta_buffers[0]) != self.chunk_size:
+            self._delta_buffers = (bytearray(self.chunk_size), bytearray(self.chunk_size))
+        return self._delta_buffers
+
+    def release(self, src_fd, dst_fd, start, end):
+        """Drop a completed range of both files from the page cache."""
+        if not self.drop_cache or end <= start:
+            return
+        os.fdatasync(dst_fd)  # dirty pages cannot be dropped until they are written back
+        os.posix_fadvise(src_fd, start, end - start, os.POSIX_FADV_DONTNEED)
+        os.posix_fadvise(dst_fd, start, end - start, os.POSIX_FADV_DONTNEED)
+
+def align_up(length, alignment=DIRECT_ALIGNMENT):
+    return (length + alignment - 1) // alignment * alignment
+
+def parse_chunk_size(value):
+    if value == 'auto':
+        return value
+    units = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+    multiplier = units.get(value[-1:].upper(), 1)
+    digits = value[:-1] if multiplier > 1 else value
     try:
-        copytree(source, destination, copy_function=copy_with_tqdm)
-    except FileExistsError:
+        size = int(digits) * multiplier
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid chunk size '{value}'")
+    if not MIN_CHUNK_SIZE <= size <= MAX_CHUNK_SIZE:
+        raise argparse.ArgumentTypeError("chunk size must be between 64K and 64M")
+    return size
+
+def copy_with_progress(source, destination, backend='auto', delta=False, io=None):
+    if os.path.exists(destination) and not delta:
         print(f"The destination directory '{destination}' It already exists.")
         sys.exit(1)
 
-def copy_with_tqdm(src, dst):
-    if os.path.isdir(dst):
-        dst = os.path.join(dst, os.path.basename(src))
-    total_size = sum(os.path.getsize(os.path.join(dirpath, filename)) for dirpath, _, filenames in os.walk(src) for filename in filenames)
-
-    with tqdm(total=total_size, unit='B', unit_scale=True, unit_divisor=1024, desc=os.path.basename(src)) as pbar:
-        with open(src, 'rb') as fsrc:
-            with open(dst, 'wb') as fdst:
-                while True:
-                    buf = fsrc.read(1024 * 1024)
-                    if not buf:
-                        break
-                    fdst.write(buf)
-                    pbar.update(len(buf))
+    manifest = build_manifest(source)
+    total_size = sum(entry.size if delta else entry.data for entry in manifest if not stat.S_ISDIR(entry.mode))
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    os.makedirs(destination, exist_ok=delta)
+    written = 0
+    with tqdm(total=total_size, unit='B', unit_scale=True, unit_divisor=1024,
+              desc=os.path.basename(os.path.normpath(source))) as pbar:
+        for entry in manifest:
+            src = os.path.join(source, entry.path)
+            dst = os.path.join(destination, entry.path)
+            if stat.S_ISDIR(entry.mode):
+                os.makedirs(dst, exist_ok=delta)
+            elif delta and os.path.isfile(dst):
+                written += delta_with_tqdm(src, dst, pbar, io)
+                pbar.set_postfix_str(f"written {tqdm.format_sizeof(written, 'B', 1024)}")
+            else:
+                copy_with_tqdm(src, dst, pbar, entry.size, backend, sparse=entry.data < entry.size, io=io)
+                written += entry.data
+                if delta:
+                    pbar.update(entry.size - entry.data)  # the delta total counts holes, the copy only data
+
+def build_manifest(source):
+    """Scan the source tree once; directories always precede their contents in the returned list."""
+    manifest = []
+    pending = ['']
+    while pending:
+        relative_dir = pending.pop()
+        with os.scandir(os.path.join(source, relative_dir)) as entries:
+            for entry in entries:
+                st = entry.stat()
+                path = os.path.join(relative_dir, entry.name)
+                data = st.st_size
+                if stat.S_ISREG(st.st_mode) and st.st_blocks * 512 < st.st_size:
+                    data = sparse_data_size(entry.path, st.st_size)
+                manifest.append(ManifestEntry(path, st.st_size, st.st_mode, st.st_mtime, data))
+                if stat.S_ISDIR(st.st_mode):
+                    pending.append(path)
+    return manifest
+
+def data_segments(fd, size):
+    """Return the (start, end) data regions of fd, skipping holes; the whole file if SEEK_DATA is unsupported."""
+    if not hasattr(os, 'SEEK_DATA'):
+        return [(0, size)]
+    segments = []
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                break  # only a hole is left
+            if e.errno in (errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP):
+                return [(0, size)]
+            raise
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        if start >= end:
+            break
+        segments.append((start, end))
+        offset = end
+    return segments
+
+def sparse_data_size(path, size):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return sum(end - start for start, end in data_segments(fd, size))
+    finally:
+        os.close(fd)
+
+def reflink(src_fd, dst_fd):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+def copy_file_range_step(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+def sendfile_step(src_fd, dst_fd, offset, count):
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+KERNEL_BACKENDS = []
+if hasattr(os, 'copy_file_range'):
+    KERNEL_BACKENDS.append(('copy_file_range', copy_file_range_step))
+if hasattr(os, 'sendfile'):
+    KERNEL_BACKENDS.append(('sendfile', sendfile_step))
+
+def readinto_step(src_fd, dst_fd, offset, count, io):
+    """Userspace copy of one chunk through the reusable buffer; with io.direct the fds are O_DIRECT."""
+    view = io.buffer()
+    if io.direct:
+        count = align_up(count)
+    length = os.preadv(src_fd, [view[:count]], offset)
+    # O_DIRECT writes whole blocks; the padding past the end of the file is cut by the final truncate.
+    to_write = align_up(length) if io.direct else length
+    written = 0
+    while written < to_write:
+        written += os.pwrite(dst_fd, view[written:to_write], offset + written)
+    return length
+
+def transfer(src_fd, dst_fd, update, backend='auto', size=None, sparse=True, io=None):
+    """Copy src_fd into dst_fd chunk by chunk, calling update(n) per chunk. Returns the backend that was used.
+
+    Only the data regions are transferred; holes are recreated by the final truncate, so update() counts data bytes.
+    """
+    if io is None:
+        io = IOTuning()
+    if size is None:
+        size = os.fstat(src_fd).st_size
+    segments = data_segments(src_fd, size) if sparse else [(0, size)]
+
+    if not io.direct and backend in ('auto', 'reflink') and reflink(src_fd, dst_fd):
+        update(sum(end - start for start, end in segments))
+        return 'reflink'
+
+    steps = [] if io.direct else [(name, step) for name, step in KERNEL_BACKENDS if backend in ('auto', name)]
+    steps.append(('direct' if io.direct else 'readinto', partial(readinto_step, io=io)))
+    released = 0
+    for start, end in segments:
+        offset = start
+        while offset < end and offset < size:
+            started = time.perf_counter()
+            try:
+                copied = steps[0][1](src_fd, dst_fd, offset, min(io.chunk_size, end - offset))
+            except OSError as e:
+                if e.errno not in FALLBACK_ERRNOS or len(steps) == 1:
+                    raise
+                steps.pop(0)
+                continue
+            if not copied:
+                if len(steps) > 1:
+                    # sysfs, procfs and some FUSE mounts report a size the kernel paths cannot copy; retry the
+                    # same offset with the next backend and trust only a userspace read to report the end.
+                    steps.pop(0)
+                    continue
+                size = offset  # the source shrank while we were copying it; do not pad it with zeros
+                break
+            io.record(copied, time.perf_counter() - started)
+            copied = min(copied, end - offset)
+            offset += copied
+            update(copied)
+            if offset - released >= DROP_CACHE_RANGE:
+                io.release(src_fd, dst_fd, released, offset)
+                released = offset
+
+    os.ftruncate(dst_fd, size)
+    io.release(src_fd, dst_fd, released, size)
+    return steps[0][0]
+
+def open_pair(src, dst, io):
+    """Open src and dst for a copy, falling back to buffered I/O where the filesystem refuses O_DIRECT."""
+    direct = os.O_DIRECT if io.direct and hasattr(os, 'O_DIRECT') else 0
+    try:
+        src_fd = os.open(src, os.O_RDONLY | direct)
+    except OSError as e:
+        if not direct or e.errno != errno.EINVAL:
+            raise
+        tqdm.write("O_DIRECT is not supported here, using buffered I/O.")
+        io.direct = False
+        return open_pair(src, dst, io)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | direct, 0o666)
+    except OSError as e:
+        os.close(src_fd)
+        if not direct or e.errno != errno.EINVAL:
+            raise
+        tqdm.write("O_DIRECT is not supported here, using buffered I/O.")
+        io.direct = False
+        return open_pair(src, dst, io)
+    return src_fd, dst_fd
+
+def copy_with_tqdm(src, dst, pbar, size=None, backend='auto', sparse=True, io=None):
+    if io is None:
+        io = IOTuning()
+    src_fd, dst_fd = open_pair(src, dst, io)
+    try:
+        transfer(src_fd, dst_fd, pbar.update, backend, size, sparse, io)
+    finally:
+        os.close(dst_fd)
+        os.close(src_fd)
+
+def delta_transfer(src_fd, dst_fd, update, io=None):
+    """Rewrite only the io.chunk_size blocks of dst_fd that differ from src_fd, calling update(n) per scanned block.
+
+    Returns the number of bytes written. With io.drop_cache, scanned ranges leave the page cache as in transfer().
+    """
+    if io is None:
+        io = IOTuning()
+    source, destination = io.delta_buffers()
+    block = len(source)
+    written = 0
+    offset = 0
+    released = 0
+    while True:
+        length = os.preadv(src_fd, [source], offset)
+        if not length:
+            break
+        dst_length = os.preadv(dst_fd, [destination], offset)
+        # Whole bytearrays compare with memcmp; only the short last block needs slicing.
+        if length == block and dst_length == block:
+            same = source == destination
+        else:
+            same = length == dst_length and source[:length] == destination[:length]
+        if not same:
+            os.pwrite(dst_fd, memoryview(source)[:length], offset)
+            written += length
+        offset += length
+        update(length)
+        if offset - released >= DROP_CACHE_RANGE:
+            io.release(src_fd, dst_fd, released, offset)
+            released = offset
+    os.ftruncate(dst_fd, offset)
+    io.release(src_fd, dst_fd, released, offset)
+    return written
+
+def delta_with_tqdm(src, dst, pbar, io=None):
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_RDWR)
+        try:
+            return delta_transfer(src_fd, dst_fd, pbar.update, io)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+def python_loop_copy(src, dst, update):
+    """The original read()/write() loop, kept as the benchmark baseline."""
+    with open(src, 'rb') as fsrc:
+        with open(dst, 'wb') as fdst:
+            while True:
+                buf = fsrc.read(CHUNK_SIZE)
+                if not buf:
+                    break
+                fdst.write(buf)
+                update(len(buf))
+
+def benchmark(size_mb):
+    workdir = tempfile.mkdtemp(prefix='progress-copy-bench-', dir='.')
+    try:
+        src = os.path.join(workdir, 'source.bin')
+        with open(src, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(CHUNK_SIZE))
+        print(f"Scratch file: {size_mb} MiB in {workdir}")
+        benchmark_file(src, workdir, size_mb)
+        benchmark_io_modes(src, workdir, size_mb)
+        os.remove(src)
+
+        sparse_src = os.path.join(workdir, 'sparse.bin')
+        data_mb = write_sparse_file(sparse_src, size_mb)
+        print(f"Sparse file: {size_mb} MiB apparent, {data_mb:.0f} MiB of data, "
+              f"{os.stat(sparse_src).st_blocks} blocks allocated")
+        failures = benchmark_file(sparse_src, workdir, data_mb)
+    finally:
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+    if failures:
+        print(f"{failures} backend(s) did not reproduce the sparse file exactly.")
+        sys.exit(1)
+
+def write_sparse_file(path, size_mb, stride_mb=SPARSE_CHECK_STRIDE_MB):
+    """Synthetic sparse image: one data MiB every stride_mb MiB, with a trailing hole. Returns the MiB of data."""
+    with open(path, 'wb') as f:
+        for offset in range(0, size_mb - stride_mb, stride_mb):
+            f.seek(offset * CHUNK_SIZE)
+            f.write(os.urandom(CHUNK_SIZE))
+        f.truncate(size_mb * CHUNK_SIZE)
+    return sparse_data_size(path, size_mb * CHUNK_SIZE) / CHUNK_SIZE
+
+def copy_problems(src, dst):
+    """Why dst is not a faithful copy of src: different bytes, or more blocks allocated (holes filled in)."""
+    problems = []
+    if not filecmp.cmp(src, dst, shallow=False):
+        problems.append("contents differ")
+    src_blocks, dst_blocks = os.stat(src).st_blocks, os.stat(dst).st_blocks
+    if dst_blocks > src_blocks:
+        problems.append(f"{dst_blocks} blocks allocated, source has {src_blocks}")
+    return problems
+
+def benchmark_file(src, workdir, data_mb):
+    """Time every backend on src and check each copy; returns the number of backends whose copy is not faithful."""
+    runs = [('python read/write', lambda dst: python_loop_copy(src, dst, lambda n: None))]
+    for backend in BACKENDS[1:]:
+        runs.append((backend, partial(benchmark_backend, src, backend=backend)))
+
+    failures = 0
+    for label, run in runs:
+        dst = os.path.join(workdir, 'destination.bin')
+        start = time.perf_counter()
+        used = run(dst) or label
+        elapsed = time.perf_counter() - start
+        problems = copy_problems(src, dst)
+        if label != runs[0][0] and problems:  # the read()/write() baseline fills holes by design
+            failures += 1
+        print(f"  {label:<18} {data_mb / elapsed:10.1f} MiB/s  used={used:<16} blocks={os.stat(dst).st_blocks:<8} "
+              f"{'; '.join(problems) or 'byte-exact, holes kept'}")
+        os.remove(dst)
+    return failures
+
+def check_sparse(size_mb=SPARSE_CHECK_MB):
+    """Regression check: copy a synthetic sparse tree with every backend and require byte-identical files with no
+    more blocks allocated than the source. Returns the exit status."""
+    workdir = tempfile.mkdtemp(prefix='progress-copy-check-', dir='.')
+    try:
+        source = os.path.join(workdir, 'source')
+        os.makedirs(os.path.join(source, 'images'))
+        src = os.path.join(source, 'images', 'disk.img')
+        write_sparse_file(src, size_mb)
+        with open(os.path.join(source, 'notes.txt'), 'w') as f:
+            f.write('not sparse\n')
+        failures = 0
+        for backend in BACKENDS:
+            destination = os.path.join(workdir, backend)
+            copy_with_progress(source, destination, backend)
+            for name in ('images/disk.img', 'notes.txt'):
+                problems = copy_problems(os.path.join(source, name), os.path.join(destination, name))
+                failures += bool(problems)
+                print(f"  {backend:<16} {name:<16} {'; '.join(problems) or 'ok'}")
+        return 1 if failures else 0
+    finally:
+        for root, dirs, files in os.walk(workdir, topdown=False):
+            for name in files:
+                os.remove(os.path.join(root, name))
+            for name in dirs:
+                os.rmdir(os.path.join(root, name))
+        os.rmdir(workdir)
+
+def benchmark_backend(src, dst, backend, io=None):
+    if io is None:
+        io = IOTuning()
+    src_fd, dst_fd = open_pair(src, dst, io)
+    try:
+        return transfer(src_fd, dst_fd, lambda n: None, backend, io=io)
+    finally:
+        os.close(dst_fd)
+        os.close(src_fd)
+
+def cache_residency(path):
+    """Fraction of the file's pages that sit in the page cache (mincore), or None where it cannot be measured."""
+    size = os.path.getsize(path)
+    library = ctypes.util.find_library('c')
+    if not size or not library:
+        return None
+    libc = ctypes.CDLL(library, use_errno=True)
+    libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_ubyte)]
+    pages = (size + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+    residency = (ctypes.c_ubyte * pages)()
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_COPY)
+    try:
+        anchor = ctypes.c_char.from_buffer(mapping)
+        result = libc.mincore(ctypes.addressof(anchor), size, residency)
+        del anchor
+    finally:
+        mapping.close()
+    if result != 0:
+        return None
+    return sum(page & 1 for page in residency) / pages
+
+def evict(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+def benchmark_io_modes(src, workdir, size_mb):
+    modes = [
+        ('buffered 1M', IOTuning),
+        ('buffered auto', partial(IOTuning, auto=True)),
+        ('drop-cache', partial(IOTuning, drop_cache=True)),
+        ('O_DIRECT', partial(IOTuning, direct=True)),
+        ('O_DIRECT auto', partial(IOTuning, auto=True, direct=True)),
+    ]
+    print("I/O modes (source evicted from the page cache before each run):")
+    for label, make_io in modes:
+        dst = os.path.join(workdir, 'destination.bin')
+        if hasattr(os, 'posix_fadvise'):
+            evict(src)
+        io = make_io()
+        start = time.perf_counter()
+        used = benchmark_backend(src, dst, 'readinto', io)
+        elapsed = time.perf_counter() - start
+        residency = [cache_residency(path) for path in (src, dst)]  # before filecmp pulls both files back in
+        identical = filecmp.cmp(src, dst, shallow=False)
+        cached = '  '.join('n/a' if r is None else f"{r * 100:5.1f}%" for r in residency)
+        print(f"  {label:<18} {size_mb / elapsed:10.1f} MiB/s  used={used:<9} chunk={io.chunk_size // 1024:>6}K  "
+              f"byte-exact={identical}  cached src/dst: {cached}")
+        os.remove(dst)
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy a directory tree with a progress bar (permissions are not preserved).')
+    parser.add_argument('source', nargs='?', help='Origin directory')
+    parser.add_argument('destination', nargs='?', help='Destination directory (must not exist)')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto',
+                        help='Transfer path to use (default: auto, fastest available)')
+    parser.add_argument('--delta', action='store_true',
+                        help='Update an existing destination in place, rewriting only the blocks that differ')
+    parser.add_argument('--chunk-size', type=parse_chunk_size, default=CHUNK_SIZE, metavar='SIZE|auto',
+                        help='Transfer chunk size such as 4M, or auto to tune it from the observed throughput (default: 1M)')
+    parser.add_argument('--direct', action='store_true',
+                        help='Bypass the page cache with O_DIRECT (falls back to buffered I/O where unsupported)')
+    parser.add_argument('--drop-cache', action='store_true',
+                        help='Drop copied ranges from the page cache with posix_fadvise(DONTNEED)')
+    parser.add_argument('--benchmark', type=int, nargs='?', const=1024, metavar='SIZE_MB',
+                        help='Compare transfer backends on a scratch file in the current directory (default: 1024 MiB)')
+    parser.add_argument('--check-sparse', action='store_true',
+                        help='Copy a synthetic sparse file with every backend and exit 1 unless holes and bytes survive')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+
+    if args.check_sparse:
+        sys.exit(check_sparse())
+
+    if not args.source or not args.destination:
         print("Usage: copy-progress.py origin destination")
         sys.exit(1)
 
-    source_dir = sys.argv[1]
-    dest_dir = sys.argv[2]
-    copy_with_progress(source_dir, dest_dir)
+    auto = args.chunk_size == 'auto'
+    io = IOTuning(CHUNK_SIZE if auto else args.chunk_size, auto=auto, direct=args.direct, drop_cache=args.drop_cache)
+    copy_with_progress(args.source, args.destination, args.backend, args.delta, io)
+
+if __name__ == "__main__":
+    main()